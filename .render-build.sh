@@ -7,4 +7,7 @@ pip install --upgrade pip setuptools wheel
 echo "📦 Installing requirements..."
 pip install -r requirements.txt
 
+echo "⚙️ Precompiling bytecode..."
+python -m compileall -q -j0 .
+
 echo "✅ Build complete!"
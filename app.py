@@ -1,31 +1,39 @@
-import eventlet
-eventlet.monkey_patch()
-
 import os
 import sys
+import base64
+import time
+import queue
 import logging
+import itertools
+import importlib
+import threading
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
 from pathlib import Path
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_mail import Mail
 from flask_cors import CORS
 from dotenv import load_dotenv
-from tensorflow.keras.models import load_model
-from backend.routes.auth import auth_bp
-from backend.routes.main import main_bp
-from backend.routes.api import api_bp
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
 
 import joblib
 import numpy as np
+import orjson
 
 # Add backend folder to sys.path for local imports
 sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
 
 # Import your models here (adjust if models in backend/models.py)
 from models import User, db
+from services import cache as redis_cache
 
 # Load environment variables from .env
 load_dotenv()
@@ -41,53 +49,601 @@ logger = logging.getLogger(__name__)
 migrate = Migrate()
 login_manager = LoginManager()
 mail = Mail()
-socketio = SocketIO(async_mode='eventlet', cors_allowed_origins="*")
+socketio = SocketIO(async_mode='threading', cors_allowed_origins="*")
 
 # Globals for ML models
 ann_model = None
 cnn_lstm_model = None
 scaler = None
+ann_dispatcher = None
+cnn_lstm_dispatcher = None
+_models_loaded = False
+_models_lock = threading.Lock()
+# Set by stage_ml_models() in a forking server's master; each child then
+# loads the models itself
+_staged_config = None
+_staged_tflite = None
+
+# (module, attribute, url_prefix) of every blueprint the app registers
+BLUEPRINTS = (
+    ('backend.routes.auth', 'auth_bp', '/auth'),
+    ('backend.routes.main', 'main_bp', None),
+    ('backend.routes.api', 'api_bp', '/api'),
+)
 
-
-def load_ml_models():
-    """Load ML models on startup"""
-    global ann_model, cnn_lstm_model, scaler
-    try:
-        ann_model = load_model('models/emotion_ann_model.h5')
-        logger.info("✅ ANN model loaded")
-    except Exception as e:
-        logger.warning(f"ANN model not loaded: {e}")
-
-    try:
-        cnn_lstm_model = load_model('models/cnn_lstm_model.h5')
-        logger.info("✅ CNN-LSTM model loaded")
-    except Exception as e:
-        logger.warning(f"CNN-LSTM model not loaded: {e}")
-
+# Model output index -> emotion label
+LABELS = ('baseline', 'stress', 'amusement')
+
+# Pre-drawn labels for the no-model fallback, read as a ring (index & 4095)
+_FALLBACK_LABEL_IDX = tuple(np.random.default_rng().integers(0, len(LABELS), 4096).tolist())
+_fallback_counter = itertools.count()
+
+# Per-thread (1, n_features) request buffers, see _input_buffer()
+_request_local = threading.local()
+
+# INT8 model produced offline by scripts/convert_ann_tflite.py
+ANN_TFLITE_PATH = 'models/emotion_ann_int8.tflite'
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (also serializes numpy values)"""
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # jsonify() path: hand orjson's bytes to the response as-is instead
+        # of decoding to str only for Werkzeug to encode it again
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+
+class TFLiteModel:
+    """Keras-style predict() wrapper around a TFLite interpreter.
+
+    The stock interpreter applies the XNNPACK delegate to supported ops by
+    default, which covers the dense/quantized kernels of the ANN on x86.
+    The flatbuffer is read into memory once and the interpreter is built from
+    ``model_content``, so reloading in a forked worker never touches disk and
+    preloaded workers share the bytes copy-on-write.
+    """
+
+    def __init__(self, model_path, num_threads=None, model_content=None):
+        self.model_path = model_path
+        self.model_content = model_content if model_content is not None else Path(model_path).read_bytes()
+        self.num_threads = num_threads or os.cpu_count()
+        self.reload()
+
+    def reload(self):
+        """(Re)create the interpreter, e.g. in a worker forked after loading"""
+        import tensorflow as tf
+        self.interpreter = tf.lite.Interpreter(
+            model_content=self.model_content,
+            num_threads=self.num_threads
+        )
+        self.interpreter.allocate_tensors()
+        input_details = self.interpreter.get_input_details()[0]
+        self.input_index = input_details['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = int(input_details['shape'][0])
+
+    def predict(self, features, verbose=0):
+        features = np.asarray(features, dtype=np.float32)
+        if features.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, features.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = features.shape[0]
+
+        self.interpreter.set_tensor(self.input_index, features)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+
+class KerasModel:
+    """predict()-compatible wrapper that calls a Keras model directly.
+
+    ``Model.predict`` sets up callbacks, a data adapter and a distribution
+    strategy on every call, which dominates for one-row requests. Instead the
+    forward pass is traced once into a ``tf.function`` with a fixed input
+    signature (batch dimension left open), so requests reuse one concrete
+    graph with no retracing. With ``jit_compile`` the graph is XLA-compiled,
+    fusing the elementwise ops (bias-add, activations, softmax) into the
+    matmuls/convolutions around them.
+    """
+
+    def __init__(self, model, jit_compile=True):
+        self.model = model
+        self.infer = self._trace(jit_compile)
+        self._settle_infer()
+
+    def _settle_infer(self):
+        """Compile one row now, falling back to a plain graph if XLA can't compile the model.
+
+        This is the only place ``infer`` is replaced, and it runs before the
+        model is handed to a BatchDispatcher, so the dispatcher thread never
+        sees the function swapped mid-call.
+        """
+        try:
+            self.predict(np.zeros((1, *self.model.input_shape[1:]), dtype=np.float32))
+        except Exception as e:
+            logger.warning(f"XLA compilation failed, serving without jit_compile: {e}")
+            self.infer = self._trace(jit_compile=False)
+            self.predict(np.zeros((1, *self.model.input_shape[1:]), dtype=np.float32))
+
+    def _trace(self, jit_compile):
+        import tensorflow as tf
+        model = self.model
+        return tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, *model.input_shape[1:]], tf.float32)],
+            jit_compile=jit_compile
+        )
+
+    def predict(self, features, verbose=0):
+        return self.infer(np.asarray(features, dtype=np.float32)).numpy()
+
+    def warmup(self, batch_sizes=(1,)):
+        """Run dummy batches so tracing/compilation isn't paid by the first requests.
+
+        XLA compiles once per concrete batch size, so pass every size the
+        caller will actually send (the dispatcher's buckets). Never replaces
+        ``infer``, so it can run on a background thread next to the dispatcher.
+        """
+        for n in batch_sizes:
+            try:
+                self.predict(np.zeros((n, *self.model.input_shape[1:]), dtype=np.float32))
+            except Exception as e:
+                logger.warning(f"Warmup failed for batch size {n}: {e}")
+
+
+def batch_buckets(max_batch_size):
+    """Batch sizes the dispatcher pads to: powers of two below max_batch_size, then max_batch_size"""
+    sizes = []
+    n = 1
+    while n < max_batch_size:
+        sizes.append(n)
+        n *= 2
+    sizes.append(max_batch_size)
+    return tuple(sizes)
+
+
+class BatchDispatcher:
+    """Coalesce concurrent prediction requests into a single model call.
+
+    Requests are queued as (features, future) pairs, where ``features`` holds
+    one or more samples of ``sample_shape``. A background thread takes the
+    first waiting request, drains more while they fit in ``max_batch_size``
+    rows (waiting at most ``batch_timeout_ms`` for stragglers), runs the model
+    once on the stacked batch and hands each caller its own output rows. A
+    request that doesn't fit is carried over to the next batch, which starts
+    as soon as the previous one completes.
+
+    Samples are copied into a float32 buffer allocated once up front, so
+    building a batch never allocates. Each batch is zero-padded up to the next
+    of ``buckets`` (see batch_buckets), so an XLA-compiled model only ever
+    sees a handful of batch sizes instead of every size up to the maximum.
+    """
+
+    def __init__(self, run_batch, sample_shape, max_batch_size=32, batch_timeout_ms=10):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.buckets = batch_buckets(max_batch_size)
+        self.batch_timeout = batch_timeout_ms / 1000.0
+        self.buffer = np.empty((max_batch_size, *sample_shape), dtype=np.float32)
+        self.start()
+
+    def start(self):
+        """Start the worker thread (again after a fork, where threads don't survive)"""
+        self.queue = queue.Queue()
+        self.carry = None
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker.start()
+
+    def submit(self, features):
+        """Queue a (n_samples, *sample_shape) array and wait for its output rows"""
+        if len(features) > self.max_batch_size:
+            return np.concatenate([
+                self.submit(features[i:i + self.max_batch_size])
+                for i in range(0, len(features), self.max_batch_size)
+            ])
+        done = Future()
+        self.queue.put((features, done))
+        return done.result()
+
+    def _collect_batch(self):
+        if self.carry is not None:
+            batch, self.carry = [self.carry], None
+        else:
+            batch = [self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.batch_timeout
+        while rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if rows + len(item[0]) > self.max_batch_size:
+                self.carry = item
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _worker_loop(self):
+        while True:
+            batch = self._collect_batch()
+            rows = 0
+            for features, _ in batch:
+                self.buffer[rows:rows + len(features)] = features
+                rows += len(features)
+            padded = self.buckets[bisect_left(self.buckets, rows)]
+            self.buffer[rows:padded] = 0
+            try:
+                outputs = self.run_batch(self.buffer[:padded])
+            except Exception as e:
+                logger.error(f"Batch prediction error ({rows} samples): {e}")
+                for _, done in batch:
+                    done.set_exception(e)
+                continue
+
+            rows = 0
+            for features, done in batch:
+                done.set_result(outputs[rows:rows + len(features)])
+                rows += len(features)
+
+
+class UpdateEmitter:
+    """Send Socket.IO updates from one background task instead of the request thread.
+
+    Only the most recent payload is kept (``deque(maxlen=1)``), and the
+    sender waits ``interval`` seconds after being woken. A burst of
+    predictions therefore becomes one frame per interval carrying the
+    latest state. The HTTP response never waits on websocket I/O.
+    """
+
+    def __init__(self, socketio, event, interval=0.05):
+        self.socketio = socketio
+        self.event = event
+        self.interval = interval
+        self.pending = deque(maxlen=1)
+        self.reset()
+
+    def reset(self):
+        """Forget the sender task so the next push starts one (used after fork)"""
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.started = False
+
+    def push(self, payload):
+        self.pending.append(payload)
+        self.wakeup.set()
+        if not self.started:
+            with self.lock:
+                if not self.started:
+                    self.socketio.start_background_task(self._run)
+                    self.started = True
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.socketio.sleep(self.interval)
+            self.wakeup.clear()
+            try:
+                payload = self.pending.pop()
+            except IndexError:
+                continue
+            try:
+                self.socketio.emit(self.event, payload)
+            except Exception as e:
+                logger.error(f"Error emitting {self.event}: {e}")
+
+
+emotion_emitter = UpdateEmitter(socketio, 'emotion_update')
+
+
+def _predict_ann_batch(features):
+    """Scale (in place) and run the ANN on a stacked (batch, n_features) array"""
+    return ann_model.predict(scaler.transform(features, copy=False), verbose=0)
+
+
+def _fuse_scaler(model, fitted_scaler):
+    """Prepend a fitted StandardScaler to a Keras model as a frozen Normalization layer.
+
+    The fused model takes raw features, so the sklearn transform (and its
+    extra array pass) drops out of the request path.
+    """
+    import tensorflow as tf
+    fused = tf.keras.Sequential([
+        tf.keras.Input(shape=(fitted_scaler.n_features_in_,)),
+        tf.keras.layers.Normalization(mean=fitted_scaler.mean_, variance=np.square(fitted_scaler.scale_)),
+        model
+    ])
+    fused.trainable = False
+    return fused
+
+
+def _input_buffer():
+    """Return this thread's reusable (1, n_features) float32 input buffer"""
+    buf = getattr(_request_local, 'features', None)
+    if buf is None:
+        buf = _request_local.features = np.empty((1, scaler.n_features_in_), dtype=np.float32)
+    return buf
+
+
+def _build_health_bytes():
+    """Serialize the /health payload for the current model state"""
+    return orjson.dumps({
+        'status': 'healthy',
+        'service': 'WESAD Stress Detection System',
+        'version': '2.0',
+        'models_loaded': {
+            'ann': ann_model is not None,
+            'cnn_lstm': cnn_lstm_model is not None,
+            'scaler': scaler is not None
+        }
+    })
+
+
+# Prebuilt /health response body, rebuilt whenever the models (re)load
+_HEALTH_BYTES = _build_health_bytes()
+
+
+def _warm_up(models, batch_sizes):
+    """Compile each Keras model for the dispatcher's batch buckets"""
+    for model in models:
+        model.warmup(batch_sizes)
+    if models:
+        logger.info(f"✅ Models compiled for batch sizes {batch_sizes}")
+
+
+def stage_ml_models(config):
+    """Read the model files a forking server's master can share without starting TF.
+
+    TensorFlow creates its intra-/inter-op thread pools (and XLA its compiler
+    threads) the first time it runs anything, and those pools are a known
+    deadlock source in a fork()ed child. So the master only loads the scaler
+    and reads the TFLite flatbuffer, which children share copy-on-write;
+    _reset_after_fork() then loads the models in each worker.
+    """
+    global scaler, _staged_config, _staged_tflite
     try:
         scaler = joblib.load('models/scaler.save')
         logger.info("✅ Scaler loaded")
     except Exception as e:
         logger.warning(f"Scaler not loaded: {e}")
+    if os.path.exists(ANN_TFLITE_PATH):
+        _staged_tflite = Path(ANN_TFLITE_PATH).read_bytes()
+    _staged_config = config
+
+
+def load_ml_models(config, background_warmup=True):
+    """Load ML models and start the ANN batch dispatcher (once per process).
+
+    TensorFlow is only imported here, so workers that never serve a
+    prediction (auth, dashboard, health checks) don't pay its import time
+    and memory. Safe to call on every request; later calls return at once.
+    XLA warmup runs on a background thread unless ``background_warmup`` is
+    False (start-up), so a lazy load doesn't make the request that
+    triggered it wait for every compile.
+    """
+    global ann_model, cnn_lstm_model, scaler, ann_dispatcher, cnn_lstm_dispatcher, _models_loaded, _HEALTH_BYTES
+    if _models_loaded:
+        return
+
+    with _models_lock:
+        if _models_loaded:
+            return
+
+        os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+        import tensorflow as tf
+        # Pin TF's own thread pools; request concurrency comes from gunicorn threads
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(config['TF_INTRA_OP_THREADS'])
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError as e:
+            logger.warning(f"Could not set TF thread pools: {e}")
+        if not config['ML_USE_GPU']:
+            try:
+                tf.config.set_visible_devices([], 'GPU')
+            except Exception as e:
+                logger.warning(f"Could not hide GPU devices: {e}")
+
+        if scaler is None:
+            try:
+                scaler = joblib.load('models/scaler.save')
+                logger.info("✅ Scaler loaded")
+            except Exception as e:
+                logger.warning(f"Scaler not loaded: {e}")
+
+        # The INT8 TFLite model expects scaled inputs; the Keras ANN gets the scaler fused in
+        ann_batch = _predict_ann_batch
+        to_warm = []
+        try:
+            if os.path.exists(ANN_TFLITE_PATH):
+                ann_model = TFLiteModel(ANN_TFLITE_PATH, model_content=_staged_tflite)
+                logger.info("✅ ANN model loaded (INT8 TFLite)")
+            else:
+                keras_ann = tf.keras.models.load_model('models/emotion_ann_model.h5')
+                if scaler is not None:
+                    keras_ann = _fuse_scaler(keras_ann, scaler)
+                ann_model = KerasModel(keras_ann)
+                to_warm.append(ann_model)
+                ann_batch = ann_model.predict
+                logger.info("✅ ANN model loaded (scaler fused)")
+        except Exception as e:
+            logger.warning(f"ANN model not loaded: {e}")
+
+        try:
+            cnn_lstm_model = KerasModel(tf.keras.models.load_model('models/cnn_lstm_model.h5'))
+            to_warm.append(cnn_lstm_model)
+            cnn_lstm_dispatcher = BatchDispatcher(
+                cnn_lstm_model.predict,
+                sample_shape=cnn_lstm_model.model.input_shape[1:],
+                max_batch_size=config['MAX_BATCH_SIZE'],
+                batch_timeout_ms=config['BATCH_TIMEOUT_MS']
+            )
+            logger.info("✅ CNN-LSTM model loaded")
+        except Exception as e:
+            logger.warning(f"CNN-LSTM model not loaded: {e}")
+
+        if ann_model is not None and scaler is not None:
+            ann_dispatcher = BatchDispatcher(
+                ann_batch,
+                sample_shape=(scaler.n_features_in_,),
+                max_batch_size=config['MAX_BATCH_SIZE'],
+                batch_timeout_ms=config['BATCH_TIMEOUT_MS']
+            )
+
+        _HEALTH_BYTES = _build_health_bytes()
+        _models_loaded = True
+
+    buckets = batch_buckets(config['MAX_BATCH_SIZE'])
+    if background_warmup:
+        threading.Thread(target=_warm_up, args=(to_warm, buckets), daemon=True).start()
+    else:
+        _warm_up(to_warm, buckets)
+
+
+# The login user_loader runs on every authenticated request, so users are
+# cached in Redis. Credentials (password hash, Fitbit tokens) are left out
+# and load on first access.
+USER_CACHE_TTL = 300
+_USER_CACHE_SKIP = frozenset({'password_hash', 'fitbit_access_token', 'fitbit_refresh_token'})
+
+
+def _user_cache_key(user_id):
+    return f'u:{user_id}'
+
+
+def _cache_user(user):
+    redis_cache.set_json(_user_cache_key(user.id), {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns if column.key not in _USER_CACHE_SKIP
+    }, ttl=USER_CACHE_TTL)
+
+
+def _load_cached_user(user_id):
+    """User rebuilt from its Redis copy and attached to the session without a SELECT"""
+    cached = redis_cache.get_bytes(_user_cache_key(user_id))
+    if cached is None:
+        return None
+    fields = orjson.loads(cached)
+    if fields.get('created_at'):
+        fields['created_at'] = datetime.fromisoformat(fields['created_at'])
+    user = User(**fields)
+    # Treat the cached fields as the row's persisted state: changes made by
+    # the request flush as UPDATEs and the uncached columns lazy-load
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_cached_user(mapper, connection, user):
+    # Drop the cached login id under both the new and any replaced username
+    usernames = {user.username, *inspect(user).attrs.username.history.deleted}
+    nocase = connection.dialect.name == 'sqlite'
+    redis_cache.delete(_user_cache_key(user.id),
+                       *(redis_cache.login_cache_key(name, nocase) for name in usernames if name))
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """WAL journaling for the SQLite user database (readers don't block the writer)"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _reset_after_fork():
+    """Re-create per-process ML state in a worker forked from a preloaded master.
+
+    A master that only staged the model files (see stage_ml_models) leaves
+    TensorFlow untouched, so the child loads and compiles the models on a
+    background thread; requests arriving meanwhile wait on _models_lock.
+    Otherwise threads and TFLite interpreters do not survive fork(), so the
+    dispatcher thread, the interpreter and the update sender are rebuilt.
+    """
+    global _models_lock
+    _models_lock = threading.Lock()
+    emotion_emitter.reset()
+    if _staged_config is not None and not _models_loaded:
+        threading.Thread(target=load_ml_models, args=(_staged_config, False), daemon=True).start()
+        return
+    if isinstance(ann_model, TFLiteModel):
+        ann_model.reload()
+    if ann_dispatcher is not None:
+        ann_dispatcher.start()
+    if cnn_lstm_dispatcher is not None:
+        cnn_lstm_dispatcher.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _init_server_sessions(app):
+    """Keep sessions in Redis (Flask-Session) when REDIS_URL is set.
+
+    The cookie then carries only a random session id. Without Redis, or
+    without the flask_session package, Flask's signed cookie is used as before.
+    """
+    redis_client = redis_cache.get_redis()
+    if redis_client is None:
+        return
+    try:
+        from flask_session import Session
+    except ImportError:
+        logger.warning("REDIS_URL is set but Flask-Session is not installed; using cookie sessions")
+        return
+    app.config.update(SESSION_TYPE='redis', SESSION_REDIS=redis_client)
+    Session(app)
+    logger.info("✅ Server-side sessions in Redis")
 
 
 def create_app():
     app = Flask(__name__, template_folder='templates')
+    app.json = OrjsonProvider(app)
 
     # Load config from Config class
     from config import Config
     app.config.from_object(Config)
+    # Fitbit OAuth credentials are fixed per deployment: encode the Basic
+    # auth header once here instead of on every callback
+    app.config['FITBIT_BASIC_AUTH'] = 'Basic ' + base64.b64encode(
+        f"{app.config['FITBIT_CLIENT_ID']}:{app.config['FITBIT_CLIENT_SECRET']}".encode()
+    ).decode()
 
     # Initialize extensions with app context
     db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+    _init_server_sessions(app)
     socketio.init_app(app, cors_allowed_origins="*")
     mail.init_app(app)
     CORS(app)
 
-    # Load ML models once on app startup
-    load_ml_models()
+    # ML models load lazily on the first prediction unless preloading is requested.
+    # A forking server's master only stages the files; workers start TF
+    if app.config['PRELOAD_ML_MODELS']:
+        if app.config['ML_LOAD_AFTER_FORK']:
+            stage_ml_models(app.config)
+        else:
+            load_ml_models(app.config, background_warmup=False)
 
     # Configure Flask-Login
     login_manager.login_view = 'auth.login'
@@ -96,42 +652,21 @@ def create_app():
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            return User.query.get(int(user_id))
+            user = _load_cached_user(int(user_id))
+            if user is None:
+                user = db.session.get(User, int(user_id))
+                if user is not None:
+                    _cache_user(user)
+            return user
         except Exception as e:
             logger.error(f"Error loading user {user_id}: {e}")
             return None
 
-    # Initialize blueprint variables
-    auth_bp = None
-    main_bp = None
-    api_bp = None
-
-    # Import blueprints with correct paths
-    try:
-        from backend.routes.auth import auth_bp
-        from backend.routes.main import main_bp
-        from backend.routes.api import api_bp
-    except ImportError as e:
-        logger.critical(f"❌ CRITICAL BLUEPRINT IMPORT ERROR: {e}")
-
-    # Register blueprints safely
-    if auth_bp:
-        app.register_blueprint(auth_bp, url_prefix='/auth')
-        logger.info("✅ Registered blueprint 'auth'")
-    else:
-        logger.error("❌ Blueprint 'auth' not registered due to import error.")
-
-    if main_bp:
-        app.register_blueprint(main_bp)
-        logger.info("✅ Registered blueprint 'main'")
-    else:
-        logger.error("❌ Blueprint 'main' not registered due to import error.")
-
-    if api_bp:
-        app.register_blueprint(api_bp, url_prefix='/api')
-        logger.info("✅ Registered blueprint 'api'")
-    else:
-        logger.error("❌ Blueprint 'api' not registered due to import error.")
+    # Register blueprints (an import error here is fatal rather than silently skipped)
+    for module_path, attr, url_prefix in BLUEPRINTS:
+        blueprint = getattr(importlib.import_module(module_path), attr)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+        logger.info(f"✅ Registered blueprint '{blueprint.name}'")
 
     # Initialize socketio events
     try:
@@ -176,32 +711,40 @@ def create_app():
     @app.route('/predict', methods=['POST'])
     def predict_emotion():
         try:
-            data = request.get_json()
-            features = np.array(data['features']).reshape(1, -1)
-
-            if scaler and ann_model:
-                scaled_features = scaler.transform(features)
-                prediction = ann_model.predict(scaled_features)
-                label_idx = np.argmax(prediction, axis=1)[0]
-                confidence = float(prediction[0][label_idx])
+            load_ml_models(app.config)
+            data = orjson.loads(request.get_data(cache=False))
+
+            if ann_dispatcher:
+                values = data['features']
+                features = _input_buffer()
+                if not isinstance(values, list) or len(values) != features.shape[1]:
+                    return jsonify({
+                        'error': f"features must be a flat list of {features.shape[1]} numbers"
+                    }), 400
+                try:
+                    features[0, :] = values
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'features must contain only numbers'}), 400
+                row = ann_dispatcher.submit(features)[0]
+                label_idx = int(row.argmax())
+                confidence = float(row[label_idx])
             else:
-                label_idx = np.random.choice([0, 1, 2])
+                label_idx = _FALLBACK_LABEL_IDX[next(_fallback_counter) & 4095]
                 confidence = 0.75
 
-            labels_map = {0: 'baseline', 1: 'stress', 2: 'amusement'}
-            label = labels_map.get(label_idx, 'baseline')
+            label = LABELS[label_idx] if label_idx < len(LABELS) else 'baseline'
 
-            socketio.emit('emotion_update', {
+            emotion_emitter.push({
                 'emotion': label,
                 'confidence': confidence,
-                'timestamp': str(np.datetime64('now'))
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(time.time()))
             })
 
-            return jsonify({
+            return Response(orjson.dumps({
                 'label': label,
                 'confidence': confidence,
                 'model': 'ANN'
-            })
+            }), mimetype='application/json')
 
         except Exception as e:
             logger.error(f"Prediction error: {e}")
@@ -210,24 +753,33 @@ def create_app():
     @app.route('/predict-cnn-lstm', methods=['POST'])
     def predict_cnn_lstm():
         try:
-            data = request.get_json()
-            features = np.array(data['features'])
+            load_ml_models(app.config)
+            data = orjson.loads(request.get_data(cache=False))
 
-            if cnn_lstm_model:
-                prediction = cnn_lstm_model.predict(features)
-                label_idx = np.argmax(prediction, axis=1)[0]
-                confidence = float(prediction[0][label_idx])
-            else:
+            if not cnn_lstm_dispatcher:
                 return jsonify({'error': 'CNN-LSTM not available'}), 404
 
-            labels_map = {0: 'baseline', 1: 'stress', 2: 'amusement'}
-            label = labels_map.get(label_idx, 'baseline')
+            # Accept one (T, F) sequence or a (batch, T, F) stack of them
+            features = np.asarray(data['features'], dtype=np.float32)
+            if features.ndim == 2:
+                features = features[np.newaxis]
+            expected_shape = cnn_lstm_dispatcher.buffer.shape[1:]
+            if features.ndim != 3 or features.shape[1:] != expected_shape:
+                return jsonify({
+                    'error': f"features must have shape (T, F) or (batch, T, F) with (T, F) = {expected_shape}"
+                }), 400
+
+            row = cnn_lstm_dispatcher.submit(features)[0]
+            label_idx = int(row.argmax())
+            confidence = float(row[label_idx])
+
+            label = LABELS[label_idx] if label_idx < len(LABELS) else 'baseline'
 
-            return jsonify({
+            return Response(orjson.dumps({
                 'label': label,
                 'confidence': confidence,
                 'model': 'CNN-LSTM'
-            })
+            }), mimetype='application/json')
 
         except Exception as e:
             logger.error(f"CNN-LSTM error: {e}")
@@ -235,30 +787,22 @@ def create_app():
 
     @app.route('/health')
     def health_check():
-        return jsonify({
-            'status': 'healthy',
-            'service': 'WESAD Stress Detection System',
-            'version': '2.0',
-            'models_loaded': {
-                'ann': ann_model is not None,
-                'cnn_lstm': cnn_lstm_model is not None,
-                'scaler': scaler is not None
-            }
-        })
-
-    # Debug routes logging
-    logger.info("------ FLASK URL MAP ------")
-    for rule in app.url_map.iter_rules():
-        logger.info(f"{rule.endpoint}: {rule.rule}")
-    logger.info("---------------------------")
+        return Response(_HEALTH_BYTES, mimetype='application/json')
+
+    # Debug routes logging (development or LOG_URL_MAP only)
+    if (app.debug or app.config['LOG_URL_MAP']) and logger.isEnabledFor(logging.INFO):
+        logger.info("------ FLASK URL MAP ------\n" + "\n".join(
+            f"{rule.endpoint}: {rule.rule}" for rule in app.url_map.iter_rules()
+        ) + "\n---------------------------")
     logger.info(f"📁 Template folder: {app.template_folder}")
     logger.info("🚀 WESAD Application initialized successfully")
 
     return app
 
 
+app = create_app()
+
 if __name__ == '__main__':
-    app = create_app()
     is_production = os.environ.get('FLASK_ENV', 'development') == 'production'
     port = int(os.environ.get('PORT', 5000))
 
@@ -295,6 +839,3 @@ if __name__ == '__main__':
         debug=not is_production,
         use_reloader=False
     )
-
-if __name__ != '__main__':
-    app = create_app()
@@ -4,6 +4,24 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+
+def engine_options(database_uri):
+    """SQLAlchemy engine options for the given database URI"""
+    options = {
+        'pool_size': 20,
+        'max_overflow': 40,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+        'query_cache_size': 1200,
+    }
+    if database_uri.startswith('sqlite'):
+        options['connect_args'] = {'check_same_thread': False}
+    elif database_uri.startswith('postgresql+psycopg:'):
+        # psycopg 3: server-side prepare statements from their first execution
+        options['connect_args'] = {'prepare_threshold': 1}
+    return options
+
+
 class Config:
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -11,6 +29,25 @@ class Config:
     # Database Configuration (default SQLite, change as needed)
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///wesad_users.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Log every registered route at start-up (always on when app.debug is set)
+    LOG_URL_MAP = os.getenv('LOG_URL_MAP', 'False').lower() == 'true'
+
+    # ML model loading (lazy by default; preload to load at app start-up)
+    PRELOAD_ML_MODELS = os.getenv('PRELOAD_ML_MODELS', 'False').lower() == 'true'
+    # With preloading under a forking server (gunicorn), keep TF out of the master
+    ML_LOAD_AFTER_FORK = os.getenv('ML_LOAD_AFTER_FORK', 'False').lower() == 'true'
+    ML_USE_GPU = os.getenv('ML_USE_GPU', 'False').lower() == 'true'
+    TF_INTRA_OP_THREADS = int(os.getenv('TF_INTRA_OP_THREADS', 2))
+
+    # Prediction batching (coalesces concurrent /predict requests into one model call)
+    MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 32))
+    BATCH_TIMEOUT_MS = float(os.getenv('BATCH_TIMEOUT_MS', 10))
+
+    # Optional Redis cache for per-user dashboard responses (disabled when unset)
+    REDIS_URL = os.getenv('REDIS_URL')
+    API_CACHE_TTL = int(os.getenv('API_CACHE_TTL', 60))
 
     # Fitbit Configuration
     FITBIT_CLIENT_ID = os.getenv('FITBIT_CLIENT_ID', 'your-client-id-from-fitbit')
@@ -1,6 +1,5 @@
 from app import create_app
 from models import db, User
-from werkzeug.security import generate_password_hash
 
 app = create_app()
 
@@ -10,11 +9,11 @@ with app.app_context():
 
     user = User.query.filter_by(username=username).first()
     if user:
-        user.password_hash = generate_password_hash(new_password)
+        user.set_password(new_password)
         print(f"Password for user '{username}' reset.")
     else:
         user = User(username=username, email='pardhu@example.com')
-        user.password_hash = generate_password_hash(new_password)
+        user.set_password(new_password)
         db.session.add(user)
         print(f"User '{username}' created with password.")
 
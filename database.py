@@ -1,14 +1,21 @@
 import sqlite3
 import logging
 import json
+import numpy as np
+import orjson
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import os
+import atexit
 import threading
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 db_lock = threading.Lock()
 
+# Callbacks run after each committed store_prediction(), see on_prediction_stored()
+_prediction_listeners = []
+
 # Use absolute path for database
 DB_DIR = Path(__file__).parent
 DB_PATH = DB_DIR / 'stress_data.db'
@@ -16,36 +23,297 @@ DB_PATH = DB_DIR / 'stress_data.db'
 # Ensure database directory exists
 os.makedirs(DB_DIR, exist_ok=True)
 
+# Applied to every connection: WAL so readers don't block writers, one fsync
+# per checkpoint instead of per commit, and a wait instead of "database is locked"
+PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-65536;
+    PRAGMA busy_timeout=3000;
+'''
+
+
+# Generated columns, also added to older tables by init_database():
+#   ts_hour - unix hour bucket, for the hourly timeline
+#   ts_us   - exact epoch microseconds; range filters compare this integer
+#             instead of the ISO timestamp text. Whole seconds come from
+#             strftime('%s') on the text with its fraction cut out (SQLite
+#             would round it to milliseconds) and the microseconds from the
+#             1-6 digits after the '.', so no floating-point rounding is involved
+GENERATED_COLUMNS = {
+    'ts_hour': "INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', timestamp) AS INTEGER) / 3600) VIRTUAL",
+    'ts_us': (
+        "INTEGER GENERATED ALWAYS AS ("
+        "CAST(strftime('%s', substr(timestamp, 1, 19) || ltrim(substr(timestamp, 20), '.0123456789'))"
+        " AS INTEGER) * 1000000"
+        " + CASE WHEN substr(timestamp, 20, 1) = '.'"
+        " THEN CAST(round(CAST('0.' || substr(timestamp, 21, 6) AS REAL) * 1000000) AS INTEGER)"
+        " ELSE 0 END) VIRTUAL"
+    ),
+}
+
+# Indexes over ts_us, dropped to re-create the column when its definition changes
+TS_US_INDEXES = ('idx_user_tshour_us', 'idx_user_tsus_cover')
+
+# Clustered on (user_id, timestamp): the per-user time-range queries read the
+# table B-tree directly. id is kept (unique, assigned on insert) for the API.
+SQL_CREATE_PREDICTIONS = '''
+    CREATE TABLE IF NOT EXISTS predictions (
+        id INTEGER NOT NULL,
+        timestamp TEXT NOT NULL,
+        prediction TEXT NOT NULL,
+        probability REAL NOT NULL,
+        user_id TEXT NOT NULL,
+        features TEXT,
+        model_used TEXT,
+        explanation_factors TEXT,
+        heart_rate REAL,
+        stress_score REAL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        ts_hour {ts_hour},
+        ts_us {ts_us},
+        PRIMARY KEY (user_id, timestamp, id)
+    ) WITHOUT ROWID
+'''.format(**GENERATED_COLUMNS)
+
+# Statements used on the request path, kept as constants so every call hits
+# the connection's prepared-statement cache with the identical SQL string
+# predictions is WITHOUT ROWID, so ids are assigned here (MAX(id) is an
+# idx_prediction_id lookup; the statement runs under SQLite's write lock)
+SQL_INSERT_PREDICTION = '''
+    INSERT INTO predictions
+    (id, timestamp, prediction, probability, user_id, features, model_used,
+     explanation_factors, heart_rate, stress_score)
+    SELECT IFNULL(MAX(id), 0) + 1, ?, ?, ?, ?, ?, ?, ?, ?, ?
+    FROM predictions
+'''
+
+SQL_INSERT_PREDICTION_RETURNING_ID = SQL_INSERT_PREDICTION + 'RETURNING id\n'
+
+SQL_USER_STATS = '''
+    SELECT
+        COUNT(*),
+        IFNULL(SUM(prediction = 'stress'), 0),
+        IFNULL(SUM(prediction = 'baseline'), 0),
+        IFNULL(SUM(prediction = 'amusement'), 0),
+        AVG(stress_score),
+        IFNULL(SUM(prediction = 'stress' AND ts_us > ?), 0)
+    FROM predictions
+    WHERE user_id = ?
+'''
+
+SQL_HISTORY_FOR_USER = '''
+    SELECT timestamp, prediction, probability, stress_score
+    FROM predictions
+    WHERE user_id = ? AND ts_us > ?
+    ORDER BY ts_us ASC
+'''
+
+SQL_HISTORY_ALL_USERS = '''
+    SELECT timestamp, prediction, probability, stress_score
+    FROM predictions
+    WHERE ts_us > ?
+    ORDER BY ts_us ASC
+'''
+
+SQL_USER_PREDICTIONS = '''
+    SELECT
+        id, timestamp, prediction as stress_level,
+        probability as confidence, features, model_used,
+        heart_rate, stress_score
+    FROM predictions
+    WHERE user_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+
+SQL_USER_PREDICTIONS_SINCE = '''
+    SELECT
+        timestamp, prediction as stress_level,
+        probability as confidence, features, heart_rate
+    FROM predictions
+    WHERE user_id = ? AND ts_us >= ?
+    ORDER BY ts_us ASC, timestamp ASC
+'''
+
+# Only indexed columns: served entirely from idx_user_tsus_cover (secondary
+# indexes on a WITHOUT ROWID table carry the primary key, timestamp included).
+# Rows stored in the same microsecond tie on ts_us; timestamp breaks those ties
+SQL_EMOTION_TIMELINE = '''
+    SELECT
+        timestamp, prediction as emotion, probability as confidence,
+        COALESCE(NULLIF(heart_rate, 0), 75) as heart_rate
+    FROM predictions
+    WHERE user_id = ? AND ts_us >= ?
+    ORDER BY ts_us ASC, timestamp ASC
+'''
+
+SQL_EMOTION_DISTRIBUTION = '''
+    SELECT prediction, COUNT(*) as count
+    FROM predictions
+    WHERE user_id = ?
+    GROUP BY prediction
+'''
+
+SQL_RECENT_EMOTION_COUNTS = '''
+    SELECT prediction, COUNT(*) as count
+    FROM (
+        SELECT prediction
+        FROM predictions
+        WHERE user_id = ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+    )
+    GROUP BY prediction
+'''
+
+SQL_STRESS_TIMELINE = '''
+    SELECT
+        ts_hour,
+        AVG(prediction = 'stress') as stress_ratio,
+        COUNT(*) as count
+    FROM predictions
+    WHERE user_id = ? AND ts_hour >= ? AND ts_us > ?
+    GROUP BY ts_hour
+    ORDER BY ts_hour ASC
+'''
+
+SQL_COUNT_ALL = 'SELECT COUNT(*) FROM predictions'
+
+SQL_COUNT_USERS = 'SELECT COUNT(DISTINCT user_id) FROM predictions'
+
+SQL_DATE_RANGE = 'SELECT MIN(timestamp), MAX(timestamp) FROM predictions'
+
+SQL_DELETE_OLDER_THAN = 'DELETE FROM predictions WHERE ts_us < ?'
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_us(dt):
+    """Epoch microseconds for a datetime (naive values are taken as UTC), matching ts_us"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    # Integer timedelta division: exact, unlike timestamp() * 1e6
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def _connect():
+    """Open a connection to the predictions database with performance PRAGMAs applied"""
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False,
+                           cached_statements=512)
+    conn.executescript(PRAGMAS)
+    return conn
+
+
+# One long-lived connection per thread, reused across calls
+_tls = threading.local()
+_connections = []
+
+
+def _get_conn():
+    """Return this thread's connection, opening it on first use"""
+    conn = getattr(_tls, 'conn', None)
+    if conn is None:
+        conn = _tls.conn = _connect()
+        _connections.append(conn)
+    return conn
+
+
+def _close_connections():
+    """Close every per-thread connection (registered with atexit).
+
+    PRAGMA optimize first lets SQLite refresh stale planner statistics.
+    """
+    while _connections:
+        try:
+            conn = _connections.pop()
+            conn.execute('PRAGMA optimize')
+            conn.close()
+        except Exception:
+            pass
+
+
+def _reset_after_fork():
+    """Drop connections inherited from the parent; the child opens its own"""
+    global _tls, _connections
+    _tls = threading.local()
+    _connections = []
+
+
+atexit.register(_close_connections)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@contextmanager
+def read_txn():
+    """Run several read helpers against one consistent snapshot.
+
+    Opens a deferred transaction on this thread's connection, which every
+    helper in this module shares, so e.g. stats, history and distribution
+    read the same WAL snapshot with a single BEGIN. Nested use is a no-op.
+    """
+    conn = _get_conn()
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute('BEGIN DEFERRED')
+    try:
+        yield conn
+    finally:
+        conn.execute('COMMIT')
+
 
 def init_database():
     """Initialize database with all required tables"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
 
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS predictions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    prediction TEXT NOT NULL,
-                    probability REAL NOT NULL,
-                    user_id TEXT NOT NULL,
-                    features TEXT,
-                    model_used TEXT,
-                    explanation_factors TEXT,
-                    heart_rate REAL,
-                    stress_score REAL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            c.execute(SQL_CREATE_PREDICTIONS)
 
-            c.execute('CREATE INDEX IF NOT EXISTS idx_user_timestamp ON predictions(user_id, timestamp)')
+            c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_prediction_id ON predictions(id)')
             c.execute('CREATE INDEX IF NOT EXISTS idx_prediction ON predictions(prediction)')
             c.execute('CREATE INDEX IF NOT EXISTS idx_user_prediction ON predictions(user_id, prediction)')
+            # Derived time columns for tables created before they were part of the
+            # schema. SQLite can't ALTER in a STORED generated column, so they are
+            # VIRTUAL and materialized by the indexes below
+            columns = {row[1] for row in c.execute('PRAGMA table_xinfo(predictions)')}
+            # ts_us used to be derived from julianday(), which is off by a few
+            # microseconds; swap in the exact definition (VIRTUAL, so no data moves)
+            table_sql = c.execute(
+                "SELECT sql FROM sqlite_master WHERE type='table' AND name='predictions'").fetchone()[0]
+            if 'ts_us' in columns and 'julianday(timestamp)' in table_sql:
+                for index in TS_US_INDEXES:
+                    c.execute(f'DROP INDEX IF EXISTS {index}')
+                c.execute('ALTER TABLE predictions DROP COLUMN ts_us')
+                columns.discard('ts_us')
+            for name, definition in GENERATED_COLUMNS.items():
+                if name not in columns:
+                    c.execute(f'ALTER TABLE predictions ADD COLUMN {name} {definition}')
+
+            # Superseded by the integer-time indexes below
+            c.execute('DROP INDEX IF EXISTS idx_user_tshour')
+            c.execute('DROP INDEX IF EXISTS idx_user_ts_cover')
+
+            # Unix-hour bucket for the timeline aggregation
+            c.execute('''
+                CREATE INDEX IF NOT EXISTS idx_user_tshour_us
+                ON predictions(user_id, ts_hour, ts_us, prediction)
+            ''')
+
+            # Covers the history/stats range scans so they never touch the table rows
+            c.execute('''
+                CREATE INDEX IF NOT EXISTS idx_user_tsus_cover
+                ON predictions(user_id, ts_us, prediction, probability, stress_score, heart_rate)
+            ''')
 
             conn.commit()
-            conn.close()
 
         logger.info(f"✅ Database initialized at {DB_PATH}")
         return True
@@ -55,46 +323,77 @@ def init_database():
         return False
 
 
+def on_prediction_stored(listener):
+    """Register listener(user_id, stress_level, heart_rate) to run after each stored prediction"""
+    _prediction_listeners.append(listener)
+    return listener
+
+
+@on_prediction_stored
+def _push_recent_reading(user_id, stress_level, heart_rate):
+    """Keep the Redis recent-readings window in step with every stored prediction.
+
+    Registered here rather than by a route module, so scripts that only
+    import this module update the window too.
+    """
+    # Imported on first use; services pulls in config and the Fitbit client
+    from services import cache
+    cache.push_recent_reading(user_id, cache.EMOTION_CODES.get(stress_level, 0), heart_rate or 75)
+
+
+def _prediction_row(stress_level, confidence, features, user_id, model_used, factors, timestamp=None):
+    """Parameters for SQL_INSERT_PREDICTION, plus the extracted heart rate"""
+    # Extract heart rate if available
+    heart_rate = None
+    if isinstance(features, dict):
+        heart_rate = features.get('heart_rate', features.get('HR', None))
+        features_json = json.dumps(features)
+    else:
+        features_json = str(features)
+
+    # Compute stress score
+    stress_score = confidence if stress_level == 'stress' else (1 - confidence)
+
+    return (
+        timestamp or datetime.now(timezone.utc).isoformat(),
+        stress_level,
+        confidence,
+        str(user_id),
+        features_json,
+        model_used,
+        json.dumps(factors) if factors else '[]',
+        heart_rate,
+        stress_score
+    ), heart_rate
+
+
+def _notify_listeners(user_id, stress_level, heart_rate):
+    for listener in _prediction_listeners:
+        try:
+            listener(str(user_id), stress_level, heart_rate)
+        except Exception as e:
+            logger.warning(f"⚠️ Prediction listener failed: {e}")
+
+
 def store_prediction(stress_level, confidence, features, user_id, model_used, factors):
     """Store a stress prediction with enhanced data"""
     try:
+        row, heart_rate = _prediction_row(stress_level, confidence, features, user_id, model_used, factors)
+
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
 
-            # Extract heart rate if available
-            heart_rate = None
-            if isinstance(features, dict):
-                heart_rate = features.get('heart_rate', features.get('HR', None))
-                features_json = json.dumps(features)
-            else:
-                features_json = str(features)
-
-            # Compute stress score
-            stress_score = confidence if stress_level == 'stress' else (1 - confidence)
-
-            c.execute('''
-                INSERT INTO predictions 
-                (timestamp, prediction, probability, user_id, features, model_used, 
-                 explanation_factors, heart_rate, stress_score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(timezone.utc).isoformat(),
-                stress_level,
-                confidence,
-                str(user_id),
-                features_json,
-                model_used,
-                json.dumps(factors) if factors else '[]',
-                heart_rate,
-                stress_score
-            ))
+            c.execute(SQL_INSERT_PREDICTION_RETURNING_ID, row)
 
+            # fetchall() steps the statement to completion so the insert commits
+            prediction_id = c.fetchall()[0][0]
             conn.commit()
-            prediction_id = c.lastrowid
-            conn.close()
 
         logger.info(f"✅ Prediction stored: ID={prediction_id}, Level={stress_level}, Confidence={confidence:.2f}")
+
+        _notify_listeners(user_id, stress_level, heart_rate)
+
         return prediction_id
 
     except Exception as e:
@@ -102,38 +401,57 @@ def store_prediction(stress_level, confidence, features, user_id, model_used, fa
         return None
 
 
-def get_user_stats(user_id):
-    """Get comprehensive user statistics"""
+def store_predictions_bulk(predictions):
+    """Store several predictions in one transaction.
+
+    ``predictions`` is an iterable of dicts with store_prediction()'s
+    keyword arguments, plus an optional ISO ``timestamp`` for backdated rows
+    (default: now). Prediction listeners run oldest row first, so rolling
+    windows end on the newest reading. Returns the number stored; on error
+    nothing is stored and 0 is returned.
+    """
     try:
+        prepared = [_prediction_row(**pred) + (pred,) for pred in predictions]
+        if not prepared:
+            return 0
+
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
+            conn = _get_conn()
+            # The connection autocommits, so open the transaction explicitly:
+            # one commit (one WAL sync) for the whole batch, rolled back on error
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(SQL_INSERT_PREDICTION, [row for row, _, _ in prepared])
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
 
-            user_id = str(user_id)
+        logger.info(f"✅ Stored {len(prepared)} predictions in one transaction")
 
-            c.execute('SELECT COUNT(*) FROM predictions WHERE user_id = ?', (user_id,))
-            total_predictions = c.fetchone()[0]
+        for _, heart_rate, pred in sorted(prepared, key=lambda item: item[0][0]):
+            _notify_listeners(pred['user_id'], pred['stress_level'], heart_rate)
 
-            c.execute('SELECT COUNT(*) FROM predictions WHERE user_id = ? AND prediction = "stress"', (user_id,))
-            stress_episodes = c.fetchone()[0]
+        return len(prepared)
 
-            c.execute('SELECT COUNT(*) FROM predictions WHERE user_id = ? AND prediction = "baseline"', (user_id,))
-            baseline_count = c.fetchone()[0]
+    except Exception as e:
+        logger.error(f"❌ Error storing predictions: {e}")
+        return 0
 
-            c.execute('SELECT COUNT(*) FROM predictions WHERE user_id = ? AND prediction = "amusement"', (user_id,))
-            amusement_count = c.fetchone()[0]
 
-            c.execute('SELECT AVG(stress_score) FROM predictions WHERE user_id = ?', (user_id,))
-            avg_stress = c.fetchone()[0] or 0
+def get_user_stats(user_id):
+    """Get comprehensive user statistics"""
+    try:
+        with db_lock:
+            conn = _get_conn()
+            c = conn.cursor()
 
-            cutoff_24h = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-            c.execute('''
-                SELECT COUNT(*) FROM predictions 
-                WHERE user_id = ? AND timestamp > ? AND prediction = "stress"
-            ''', (user_id, cutoff_24h))
-            stress_24h = c.fetchone()[0]
+            cutoff_24h = _to_us(datetime.now(timezone.utc) - timedelta(hours=24))
 
-            conn.close()
+            # All counters in one pass over the user's rows
+            c.execute(SQL_USER_STATS, (cutoff_24h, str(user_id)))
+            total_predictions, stress_episodes, baseline_count, amusement_count, avg_stress, stress_24h = c.fetchone()
+            avg_stress = avg_stress or 0
 
         if total_predictions > 0:
             stress_ratio = stress_episodes / total_predictions
@@ -181,48 +499,42 @@ def get_user_stats(user_id):
 
 
 def get_historical_data(days=7, user_id=None):
-    """Get historical stress data for charts"""
+    """Get historical stress data for charts.
+
+    The numeric series are returned as contiguous float32 arrays (missing
+    scores become NaN), which the app's orjson provider serializes directly;
+    timestamps and emotions stay lists of strings.
+    """
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
 
-            cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+            cutoff = _to_us(datetime.now(timezone.utc) - timedelta(days=days))
 
             if user_id:
-                c.execute('''
-                    SELECT timestamp, prediction, probability, stress_score 
-                    FROM predictions 
-                    WHERE user_id = ? AND timestamp > ? 
-                    ORDER BY timestamp ASC
-                ''', (str(user_id), cutoff))
+                c.execute(SQL_HISTORY_FOR_USER, (str(user_id), cutoff))
             else:
-                c.execute('''
-                    SELECT timestamp, prediction, probability, stress_score 
-                    FROM predictions 
-                    WHERE timestamp > ? 
-                    ORDER BY timestamp ASC
-                ''', (cutoff,))
+                c.execute(SQL_HISTORY_ALL_USERS, (cutoff,))
 
             rows = c.fetchall()
-            conn.close()
 
         if not rows:
             logger.warning(f"⚠️ No historical data found for user {user_id} in last {days} days")
             return None
 
-        timestamps = [row[0] for row in rows]
-        stress_levels = [row[2] if row[1] == 'stress' else 0.3 for row in rows]
-        emotions = [row[1] for row in rows]
-        stress_scores = [row[3] for row in rows]
+        timestamps, emotions, probabilities, stress_scores = zip(*rows)
+        stress_levels = np.where(
+            np.array(emotions) == 'stress', np.array(probabilities, dtype=np.float32), np.float32(0.3)
+        )
 
         logger.info(f"✅ Retrieved {len(rows)} historical records for user {user_id}")
 
         return {
-            'timestamps': timestamps,
+            'timestamps': list(timestamps),
             'stress_levels': stress_levels,
-            'emotions': emotions,
-            'stress_scores': stress_scores
+            'emotions': list(emotions),
+            'stress_scores': np.array(stress_scores, dtype=np.float32)
         }
 
     except Exception as e:
@@ -230,36 +542,37 @@ def get_historical_data(days=7, user_id=None):
         return None
 
 
-def get_user_predictions(user_id, limit=100):
-    """Get user's recent predictions with full details"""
-    try:
-        with db_lock:
-            conn = sqlite3.connect(DB_PATH)
-            conn.row_factory = sqlite3.Row
-            c = conn.cursor()
-
-            c.execute('''
-                SELECT 
-                    id, timestamp, prediction as stress_level, 
-                    probability as confidence, features, model_used,
-                    heart_rate, stress_score
-                FROM predictions 
-                WHERE user_id = ? 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (str(user_id), limit))
+def iter_user_predictions(user_id, limit=100, parse_features=True):
+    """Yield a user's recent predictions one dict at a time.
 
-            rows = c.fetchall()
-            conn.close()
+    Rows are pulled from the cursor lazily instead of ``fetchall()``, so large
+    exports never hold the whole result set (or every parsed features blob)
+    in memory at once. The cursor lives on this thread's connection, so the
+    shared lock is only held while the query is started.
+    """
+    with db_lock:
+        c = _get_conn().cursor()
+        c.row_factory = sqlite3.Row
+        c.execute(SQL_USER_PREDICTIONS, (str(user_id), limit))
 
-        predictions = []
-        for row in rows:
-            pred = dict(row)
+    for row in c:
+        pred = dict(row)
+        if parse_features:
             try:
-                pred['features'] = json.loads(pred['features']) if pred['features'] else {}
+                pred['features'] = orjson.loads(pred['features']) if pred['features'] else {}
             except:
                 pred['features'] = {}
-            predictions.append(pred)
+        yield pred
+
+
+def get_user_predictions(user_id, limit=100, parse_features=True):
+    """Get user's recent predictions with full details.
+
+    With ``parse_features=False`` the ``features`` field is left as the raw
+    JSON text, for callers that only need the scalar columns.
+    """
+    try:
+        predictions = list(iter_user_predictions(user_id, limit, parse_features))
 
         logger.info(f"✅ Retrieved {len(predictions)} predictions for user {user_id}")
         return predictions
@@ -270,30 +583,22 @@ def get_user_predictions(user_id, limit=100):
 
 
 def get_user_predictions_since(user_id, cutoff_date):
-    """Get predictions since a specific date - for timeline"""
+    """Get predictions since a specific date - for timeline, oldest first"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
-            conn.row_factory = sqlite3.Row
+            conn = _get_conn()
             c = conn.cursor()
+            c.row_factory = sqlite3.Row
 
-            c.execute('''
-                SELECT 
-                    timestamp, prediction as stress_level, 
-                    probability as confidence, features, heart_rate
-                FROM predictions
-                WHERE user_id = ? AND timestamp >= ?
-                ORDER BY timestamp ASC
-            ''', (str(user_id), cutoff_date.isoformat()))
+            c.execute(SQL_USER_PREDICTIONS_SINCE, (str(user_id), _to_us(cutoff_date)))
 
             rows = c.fetchall()
-            conn.close()
 
         predictions = []
         for row in rows:
             pred = dict(row)
             try:
-                pred['features'] = json.loads(pred['features']) if pred['features'] else {}
+                pred['features'] = orjson.loads(pred['features']) if pred['features'] else {}
             except:
                 pred['features'] = {}
             predictions.append(pred)
@@ -306,15 +611,37 @@ def get_user_predictions_since(user_id, cutoff_date):
         return []
 
 
+def get_emotion_timeline(user_id, cutoff_date):
+    """Timeline points since a date, oldest first, already shaped for the API.
+
+    Reads only the scalar columns, so the features JSON is never loaded or
+    parsed; defaults are applied in SQL.
+    """
+    try:
+        with db_lock:
+            conn = _get_conn()
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+
+            c.execute(SQL_EMOTION_TIMELINE, (str(user_id), _to_us(cutoff_date)))
+
+            rows = c.fetchall()
+
+        return [dict(row) for row in rows]
+
+    except Exception as e:
+        logger.error(f"❌ Error fetching emotion timeline: {e}")
+        return []
+
+
 def get_total_predictions_count():
     """Get total predictions count across all users"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
-            c.execute('SELECT COUNT(*) FROM predictions')
+            c.execute(SQL_COUNT_ALL)
             count = c.fetchone()[0]
-            conn.close()
         return count
     except Exception as e:
         logger.error(f"❌ Error getting total predictions: {e}")
@@ -325,18 +652,12 @@ def get_emotion_distribution(user_id):
     """Get emotion distribution for pie chart"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
 
-            c.execute('''
-                SELECT prediction, COUNT(*) as count
-                FROM predictions
-                WHERE user_id = ?
-                GROUP BY prediction
-            ''', (str(user_id),))
+            c.execute(SQL_EMOTION_DISTRIBUTION, (str(user_id),))
 
             rows = c.fetchall()
-            conn.close()
 
         distribution = {'baseline': 0, 'stress': 0, 'amusement': 0}
         for row in rows:
@@ -352,31 +673,43 @@ def get_emotion_distribution(user_id):
         return {'baseline': 0, 'stress': 0, 'amusement': 0}
 
 
+def get_emotion_counts(user_id, limit=500):
+    """Count emotions over a user's most recent predictions in SQL"""
+    try:
+        with db_lock:
+            conn = _get_conn()
+            c = conn.cursor()
+
+            c.execute(SQL_RECENT_EMOTION_COUNTS, (str(user_id), limit))
+
+            rows = c.fetchall()
+
+        counts = {'baseline': 0, 'stress': 0, 'amusement': 0}
+        counts.update((emotion, count) for emotion, count in rows if emotion in counts)
+        return counts
+
+    except Exception as e:
+        logger.error(f"❌ Error getting emotion counts: {e}")
+        return {'baseline': 0, 'stress': 0, 'amusement': 0}
+
+
 def get_stress_timeline(user_id, hours=24):
     """Get stress timeline for last N hours"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
 
-            cutoff = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+            cutoff_dt = datetime.now(timezone.utc) - timedelta(hours=hours)
+            cutoff = _to_us(cutoff_dt)
 
-            c.execute('''
-                SELECT 
-                    strftime('%Y-%m-%d %H:00', timestamp) as hour,
-                    AVG(CASE WHEN prediction = 'stress' THEN 1 ELSE 0 END) as stress_ratio,
-                    COUNT(*) as count
-                FROM predictions
-                WHERE user_id = ? AND timestamp > ?
-                GROUP BY hour
-                ORDER BY hour ASC
-            ''', (str(user_id), cutoff))
+            # ts_hour bounds the index range; ts_us trims the first partial hour
+            c.execute(SQL_STRESS_TIMELINE, (str(user_id), int(cutoff_dt.timestamp()) // 3600, cutoff))
 
             rows = c.fetchall()
-            conn.close()
 
         timeline = [{
-            'hour': row[0],
+            'hour': datetime.fromtimestamp(row[0] * 3600, timezone.utc).strftime('%Y-%m-%d %H:00'),
             'stress_ratio': round(row[1], 2),
             'count': row[2]
         } for row in rows]
@@ -392,16 +725,15 @@ def clean_old_predictions(days=30):
     """Clean predictions older than specified days"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
 
-            cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+            cutoff = _to_us(datetime.now(timezone.utc) - timedelta(days=days))
 
-            c.execute('DELETE FROM predictions WHERE timestamp < ?', (cutoff,))
+            c.execute(SQL_DELETE_OLDER_THAN, (cutoff,))
             deleted = c.rowcount
 
             conn.commit()
-            conn.close()
 
         logger.info(f"✅ Cleaned {deleted} old predictions (>{days} days)")
         return deleted
@@ -415,9 +747,8 @@ def vacuum_database():
     """Optimize database by reclaiming unused space"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             conn.execute('VACUUM')
-            conn.close()
         logger.info("✅ Database optimized (VACUUM completed)")
         return True
     except Exception as e:
@@ -429,23 +760,21 @@ def get_database_info():
     """Get database statistics and information"""
     try:
         with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _get_conn()
             c = conn.cursor()
 
-            c.execute('SELECT COUNT(*) FROM predictions')
+            c.execute(SQL_COUNT_ALL)
             total_records = c.fetchone()[0]
 
-            c.execute('SELECT COUNT(DISTINCT user_id) FROM predictions')
+            c.execute(SQL_COUNT_USERS)
             unique_users = c.fetchone()[0]
 
-            c.execute('SELECT MIN(timestamp), MAX(timestamp) FROM predictions')
+            c.execute(SQL_DATE_RANGE)
             date_range = c.fetchone()
 
             db_size_bytes = DB_PATH.stat().st_size if DB_PATH.exists() else 0
             db_size_mb = round(db_size_bytes / (1024 * 1024), 2)
 
-            conn.close()
-
         return {
             'database_path': str(DB_PATH),
             'total_records': total_records,
@@ -1,3 +1,6 @@
+import os
+from functools import lru_cache
+
 import shap
 import numpy as np
 import pandas as pd
@@ -5,31 +8,63 @@ from tensorflow import keras
 import matplotlib.pyplot as plt
 import pickle
 
+FEATURE_COLUMNS = ['ACC_mean_x', 'ACC_mean_y', 'ACC_mean_z', 'ACC_std_x', 'ACC_std_y', 'ACC_std_z',
+                   'BVP_mean', 'BVP_std', 'EDA_mean', 'EDA_std', 'TEMP_mean', 'TEMP_std']
 
-def explain_prediction_shap(model_path, scaler_path, X_sample, feature_names):
+# Scaled background samples for DeepExplainer, written by save_shap_background()
+SHAP_BACKGROUND_PATH = 'models/shap_background.npy'
+
+
+def save_shap_background(data_path='../wesad_features.csv',
+                         scaler_path='models/scaler.save',
+                         output_path=SHAP_BACKGROUND_PATH,
+                         n_samples=100):
     """
-    Generate SHAP explanations for model predictions
+    Precompute the SHAP background set (a random sample of the scaled training data)
     """
-    # Load model and scaler
+    df = pd.read_csv(data_path)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+
+    background = shap.sample(scaler.transform(df[FEATURE_COLUMNS].values), n_samples, random_state=0)
+    np.save(output_path, background)
+
+    print(f"✅ SHAP background ({len(background)} samples) saved to {output_path}")
+    return output_path
+
+
+@lru_cache(maxsize=4)
+def _load_explainer(model_path, scaler_path, background_path):
+    """Load model + scaler and build the DeepExplainer once per (model, scaler, background)"""
     model = keras.models.load_model(model_path)
     with open(scaler_path, 'rb') as f:
         scaler = pickle.load(f)
 
-    # Prepare data
-    X_scaled = scaler.transform(X_sample)
+    explainer = shap.DeepExplainer(model, np.load(background_path))
+    return explainer, scaler
 
-    # Create SHAP explainer
-    explainer = shap.DeepExplainer(model, X_scaled[:100])  # Use subset for background
-    shap_values = explainer.shap_values(X_scaled)
 
-    # Get feature importance
-    feature_importance = {
-        feature_names[i]: abs(shap_values[0][0][i])
-        for i in range(len(feature_names))
-    }
+def explain_prediction_shap(model_path, scaler_path, X_sample, feature_names):
+    """
+    Generate SHAP explanations for model predictions
+    """
+    if os.path.exists(SHAP_BACKGROUND_PATH):
+        explainer, scaler = _load_explainer(model_path, scaler_path, SHAP_BACKGROUND_PATH)
+        X_scaled = scaler.transform(X_sample)
+    else:
+        # No precomputed background: build a one-off explainer from the sample itself
+        model = keras.models.load_model(model_path)
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+        X_scaled = scaler.transform(X_sample)
+        explainer = shap.DeepExplainer(model, X_scaled[:100])
+
+    shap_values = explainer.shap_values(X_scaled)
 
-    # Sort by importance
-    sorted_features = dict(sorted(feature_importance.items(), key=lambda x: x[1], reverse=True))
+    # Feature importance, sorted descending in one vectorized pass
+    importance = np.abs(np.asarray(shap_values[0][0]))
+    order = np.argsort(-importance, kind='stable')
+    sorted_features = {feature_names[i]: float(importance[i]) for i in order}
 
     return sorted_features, shap_values
 
@@ -42,8 +77,7 @@ def generate_shap_summary(model_path='models/emotion_ann_model.h5',
     """
     df = pd.read_csv(data_path)
 
-    feature_columns = ['ACC_mean_x', 'ACC_mean_y', 'ACC_mean_z', 'ACC_std_x', 'ACC_std_y', 'ACC_std_z',
-                       'BVP_mean', 'BVP_std', 'EDA_mean', 'EDA_std', 'TEMP_mean', 'TEMP_std']
+    feature_columns = FEATURE_COLUMNS
 
     X = df[feature_columns].values[:1000]  # Sample for speed
 
@@ -1,9 +1,10 @@
 """Generate 7 days of realistic test data"""
-import random
 from datetime import datetime, timedelta, timezone
 import sys
 from pathlib import Path
 
+import numpy as np
+
 sys.path.append(str(Path(__file__).parent))
 
 import database
@@ -16,75 +17,59 @@ def generate_timeline_data(user_id='test_user', days=7):
     # Initialize database
     database.init_database()
 
-    emotions = ['baseline', 'stress', 'amusement']
+    emotions = np.array(['baseline', 'stress', 'amusement'])
     emotion_weights = [0.6, 0.3, 0.1]  # More baseline, some stress, less amusement
 
-    total_generated = 0
-
-    # Generate data for each day
-    for day in range(days):
-        date = datetime.now(timezone.utc) - timedelta(days=days - day)
-
-        # Generate 10-20 readings per day
-        readings_per_day = random.randint(10, 20)
-
-        for reading in range(readings_per_day):
-            # Spread throughout the day
-            hour = random.randint(6, 23)
-            minute = random.randint(0, 59)
-
-            timestamp = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-
-            # Select emotion with weighted probability
-            emotion = random.choices(emotions, weights=emotion_weights)[0]
-
-            # Confidence varies by emotion
-            if emotion == 'stress':
-                confidence = random.uniform(0.65, 0.95)
-            elif emotion == 'baseline':
-                confidence = random.uniform(0.70, 0.90)
-            else:
-                confidence = random.uniform(0.60, 0.85)
-
-            # Generate realistic features
-            features = {
-                'heart_rate': random.randint(60, 100) if emotion != 'stress' else random.randint(85, 120),
-                'eda': random.uniform(0.1, 1.0),
-                'temperature': random.uniform(36.0, 37.5),
-                'respiration': random.uniform(12, 20),
-                'ACC_x': random.uniform(-2, 2),
-                'ACC_y': random.uniform(-2, 2),
-                'ACC_z': random.uniform(-2, 2)
-            }
-
-            # Store directly in database
-            import sqlite3
-            import json
-
-            conn = sqlite3.connect(database.DB_PATH)
-            c = conn.cursor()
-
-            c.execute('''
-                INSERT INTO predictions 
-                (timestamp, prediction, probability, user_id, features, model_used, 
-                 explanation_factors, heart_rate, stress_score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                timestamp.isoformat(),
-                emotion,
-                confidence,
-                user_id,
-                json.dumps(features),
-                'ANN',
-                '[]',
-                features['heart_rate'],
-                confidence if emotion == 'stress' else (1 - confidence)
-            ))
-
-            conn.commit()
-            conn.close()
-
-            total_generated += 1
+    # 10-20 readings per day, drawn for every row at once
+    readings_per_day = np.random.randint(10, 21, size=days)
+    n = int(readings_per_day.sum())
+    day_idx = np.repeat(np.arange(days), readings_per_day)
+
+    # Spread throughout the day
+    now = datetime.now(timezone.utc)
+    day_starts = [(now - timedelta(days=days - day)).replace(hour=0, minute=0, second=0, microsecond=0)
+                  for day in range(days)]
+    hours = np.random.randint(6, 24, size=n)
+    minutes = np.random.randint(0, 60, size=n)
+
+    # Select emotion with weighted probability
+    emotion_idx = np.random.choice(len(emotions), size=n, p=emotion_weights)
+    is_stress = emotion_idx == 1
+
+    # Confidence varies by emotion (baseline, stress, amusement)
+    conf_low = np.array([0.70, 0.65, 0.60])[emotion_idx]
+    conf_high = np.array([0.90, 0.95, 0.85])[emotion_idx]
+    confidence = np.random.uniform(conf_low, conf_high)
+
+    # Generate realistic features
+    heart_rate = np.where(is_stress, np.random.randint(85, 121, size=n), np.random.randint(60, 101, size=n))
+    eda = np.random.uniform(0.1, 1.0, size=n)
+    temperature = np.random.uniform(36.0, 37.5, size=n)
+    respiration = np.random.uniform(12, 20, size=n)
+    acc = np.random.uniform(-2, 2, size=(n, 3))
+
+    predictions = [
+        {
+            'timestamp': (day_starts[d] + timedelta(hours=h, minutes=m)).isoformat(),
+            'stress_level': emotion,
+            'confidence': conf,
+            'features': {
+                'heart_rate': hr, 'eda': e, 'temperature': t, 'respiration': r,
+                'ACC_x': ax, 'ACC_y': ay, 'ACC_z': az
+            },
+            'user_id': user_id,
+            'model_used': 'ANN',
+            'factors': []
+        }
+        for d, h, m, emotion, conf, hr, e, t, r, (ax, ay, az) in zip(
+            day_idx.tolist(), hours.tolist(), minutes.tolist(), emotions[emotion_idx].tolist(),
+            confidence.tolist(), heart_rate.tolist(), eda.tolist(), temperature.tolist(),
+            respiration.tolist(), acc.tolist())
+    ]
+
+    # All rows in one transaction. database registers the Redis recent-readings
+    # hook itself (_push_recent_reading), so the window picks these rows up too
+    total_generated = database.store_predictions_bulk(predictions)
 
     print(f"✅ Generated {total_generated} test predictions across {days} days")
     print(f"📊 Data spread: Baseline ~60%, Stress ~30%, Amusement ~10%")
@@ -0,0 +1,33 @@
+"""Gunicorn settings for the web process (see procfile)"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Threaded workers by default: TF releases the GIL inside its kernels, so
+# predictions in one thread overlap with Flask I/O in the others.
+# GUNICORN_WORKER_CLASS=gevent trades that for many cooperative connections
+# per worker, for deployments dominated by slow Fitbit calls; model inference
+# and SQLite queries then hold up the whole worker while they run.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', max(1, multiprocessing.cpu_count() // 2)))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+if worker_class == 'gevent':
+    # Patch here, before the preloaded app imports threading, ssl and
+    # requests, so every socket read in the app yields to other greenlets
+    from gevent import monkey
+    monkey.patch_all()
+
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+timeout = 120
+
+# Build the app once in the master, then fork. The master only stages the
+# model files (scaler, TFLite flatbuffer), shared copy-on-write; TensorFlow's
+# thread pools must not exist at fork(), so each worker loads and compiles
+# the models on a background thread as it starts (see app.stage_ml_models).
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+if preload_app:
+    os.environ.setdefault('PRELOAD_ML_MODELS', 'True')
+    os.environ.setdefault('ML_LOAD_AFTER_FORK', 'True')
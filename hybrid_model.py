@@ -1,12 +1,46 @@
 import tensorflow as tf
 from tensorflow import keras
-from tensorflow.keras import layers, Model
+from tensorflow.keras import layers, Model, mixed_precision
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def configure_mixed_precision():
+    """Enable FP16 mixed precision when a GPU is visible
+
+    Conv1D/LSTM kernels then run on tensor cores with half the activation
+    memory. Output layers stay float32 (see build_model) for a stable softmax.
+    Returns True if the policy was switched.
+    """
+    if not tf.config.list_physical_devices('GPU'):
+        logger.info("No GPU found, training in float32")
+        return False
+
+    mixed_precision.set_global_policy('mixed_float16')
+    logger.info("Mixed precision enabled (mixed_float16)")
+    return True
+
+
+def cudnn_lstm(units, return_sequences=False):
+    """LSTM layer restricted to the arguments that keep the fused cuDNN kernel
+
+    Keras silently falls back to the generic (much slower) loop if any of
+    these differ from the defaults, so they are pinned explicitly.
+    """
+    return layers.LSTM(
+        units,
+        activation='tanh',
+        recurrent_activation='sigmoid',
+        recurrent_dropout=0.0,
+        unroll=False,
+        use_bias=True,
+        return_sequences=return_sequences
+    )
+
+
 class CNNLSTMModel:
     """Hybrid CNN-LSTM model for temporal stress detection"""
 
@@ -36,15 +70,15 @@ class CNNLSTMModel:
         x = layers.Dropout(0.3)(x)
 
         # LSTM layers for temporal dependencies
-        x = layers.LSTM(128, return_sequences=True)(x)
+        x = cudnn_lstm(128, return_sequences=True)(x)
         x = layers.Dropout(0.3)(x)
-        x = layers.LSTM(64, return_sequences=False)(x)
+        x = cudnn_lstm(64)(x)
         x = layers.Dropout(0.3)(x)
 
         # Dense layers
         x = layers.Dense(64, activation='relu')(x)
         x = layers.Dropout(0.3)(x)
-        outputs = layers.Dense(self.num_classes, activation='softmax')(x)
+        outputs = layers.Dense(self.num_classes, activation='softmax', dtype='float32')(x)
 
         self.model = Model(inputs=inputs, outputs=outputs, name='CNN_LSTM_StressNet')
 
@@ -67,23 +101,21 @@ class CNNLSTMModel:
         x = layers.MaxPooling1D(pool_size=2)(x)
 
         # LSTM with return sequences for attention
-        lstm_out = layers.LSTM(128, return_sequences=True)(x)
+        lstm_out = cudnn_lstm(128, return_sequences=True)(x)
 
-        # Attention mechanism
+        # Attention mechanism: one score per timestep, softmax over time
         attention = layers.Dense(1, activation='tanh')(lstm_out)
         attention = layers.Flatten()(attention)
-        attention = layers.Activation('softmax')(attention)
-        attention = layers.RepeatVector(128)(attention)
-        attention = layers.Permute([2, 1])(attention)
+        attention = layers.Activation('softmax', dtype='float32')(attention)
 
-        # Apply attention weights
-        attended = layers.Multiply()([lstm_out, attention])
-        attended = layers.Lambda(lambda x: tf.reduce_sum(x, axis=1))(attended)
+        # Weighted sum over time as a single batched contraction
+        # ('bt,btf->bf'), without materializing a (batch, time, 128) weight tensor
+        attended = layers.Dot(axes=1)([attention, lstm_out])
 
         # Dense layers
         x = layers.Dense(64, activation='relu')(attended)
         x = layers.Dropout(0.3)(x)
-        outputs = layers.Dense(self.num_classes, activation='softmax')(x)
+        outputs = layers.Dense(self.num_classes, activation='softmax', dtype='float32')(x)
 
         self.model = Model(inputs=inputs, outputs=outputs, name='CNN_LSTM_Attention')
 
@@ -165,16 +197,25 @@ def create_windowed_dataset(features, labels, window_size=60, stride=30):
         X: windowed features (n_windows, window_size, n_features)
         y: corresponding labels (n_windows,)
     """
-    X_windows = []
-    y_windows = []
-
-    for i in range(0, len(features) - window_size + 1, stride):
-        window = features[i:i + window_size]
-        # Use majority vote for label in window
-        window_labels = labels[i:i + window_size]
-        majority_label = np.bincount(window_labels.astype(int)).argmax()
-
-        X_windows.append(window)
-        y_windows.append(majority_label)
-
-    return np.array(X_windows), np.array(y_windows)
+    features = np.asarray(features)
+    labels = np.asarray(labels).astype(int)
+
+    if len(features) < window_size:
+        return (np.empty((0, window_size) + features.shape[1:], dtype=features.dtype),
+                np.empty(0, dtype=int))
+
+    # Zero-copy views of every window, then keep every `stride`-th one.
+    # sliding_window_view appends the window axis last, so move it back to axis 1
+    X = sliding_window_view(features, window_size, axis=0)[::stride]
+    X = np.ascontiguousarray(np.moveaxis(X, -1, 1))
+    label_windows = sliding_window_view(labels, window_size)[::stride]
+
+    # Majority vote per window: offset each window's labels into its own block
+    # of bins so one bincount counts all windows (ties go to the lowest label)
+    n_windows = len(label_windows)
+    num_classes = labels.max() + 1
+    offsets = np.arange(n_windows)[:, np.newaxis] * num_classes
+    counts = np.bincount((label_windows + offsets).ravel(), minlength=n_windows * num_classes)
+    y = counts.reshape(n_windows, num_classes).argmax(axis=1)
+
+    return X, y
@@ -1,5 +1,10 @@
 """Migrate old database to new schema - FIXED VERSION"""
+import functools
+import io
+import json
+import re
 import sqlite3
+import sys
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -9,143 +14,362 @@ logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent / 'stress_data.db'
 
+# SQLAlchemy's users database (Config.SQLALCHEMY_DATABASE_URI on SQLite);
+# Flask-SQLAlchemy puts relative paths under instance/
+USERS_DB_LOCATIONS = (
+    Path(__file__).parent / 'instance' / 'wesad_users.db',
+    Path(__file__).parent / 'wesad_users.db',
+)
+
+# users columns declared NOCASE in models.User
+NOCASE_USER_COLUMNS = ('username', 'email')
+
+# Write connection: WAL with NORMAL sync (one fsync per commit), a 16 MB page
+# cache and mmap'd reads for the full-table UPDATE and rebuild passes
+MIGRATION_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-16000;
+    PRAGMA mmap_size=268435456;
+    PRAGMA temp_store=MEMORY;
+'''
+
+# verify_schema() only reads
+VERIFY_PRAGMAS = '''
+    PRAGMA query_only=1;
+    PRAGMA mmap_size=268435456;
+'''
+
+# Stamped into PRAGMA user_version once a migration completes; bump it when
+# migrate_database() gains a new step
+MIGRATION_ID = 2
+
+# Columns copied when rebuilding the table (ts_hour is generated)
+PREDICTION_COLUMNS = ('id, timestamp, prediction, probability, user_id, features, model_used, '
+                      'explanation_factors, heart_rate, stress_score, created_at')
+
+# Columns added after the original schema, and the value backfilled into
+# existing rows where they are missing or NULL
+BACKFILL_COLUMNS = {
+    'heart_rate': '75.0',
+    'stress_score': "CASE WHEN prediction = 'stress' THEN probability ELSE (1 - probability) END",
+    'created_at': 'timestamp',
+}
+
+
+def _open():
+    """Open the migration connection in autocommit mode; transactions are explicit"""
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    conn.executescript(MIGRATION_PRAGMAS)
+    return conn
+
+
+def _close(conn):
+    """Refresh planner statistics that look stale, then close"""
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+
+def _bulk_update_hr(c, pairs):
+    """Set heart_rate from (heart_rate, id) pairs: one prepared statement, N binds"""
+    c.executemany("UPDATE predictions SET heart_rate = ? WHERE id = ? AND heart_rate IS NULL", pairs)
+    return len(pairs)
+
+
+def _heart_rates_from_features(c):
+    """(heart_rate, id) pairs for rows missing heart_rate whose features JSON has one"""
+    pairs = []
+    for row_id, features in c.execute(
+            "SELECT id, features FROM predictions WHERE heart_rate IS NULL AND features IS NOT NULL"):
+        try:
+            heart_rate = json.loads(features).get('heart_rate')
+        except (ValueError, AttributeError):
+            continue
+        if isinstance(heart_rate, (int, float)):
+            pairs.append((float(heart_rate), row_id))
+    return pairs
+
+
+def rebuild_predictions(conn, existing_columns):
+    """Recreate predictions as a WITHOUT ROWID table clustered on (user_id, timestamp, id).
+
+    Columns missing from the old table are computed from BACKFILL_COLUMNS and
+    NULLs in existing ones are filled on the way, so adding columns,
+    backfilling and re-clustering cost one INSERT ... SELECT copy instead of
+    an ALTER TABLE per column plus UPDATE passes. Runs inside the caller's
+    transaction; indexes are recreated by database.init_database() afterwards.
+    """
+    import database
+
+    select = []
+    for column in PREDICTION_COLUMNS.split(', '):
+        backfill = BACKFILL_COLUMNS.get(column)
+        if column not in existing_columns:
+            select.append(backfill or 'NULL')
+        elif backfill:
+            select.append(f'COALESCE({column}, {backfill})')
+        else:
+            select.append(column)
 
-def migrate_database():
-    """Add missing columns to existing database WITHOUT deleting data"""
-    print("\n" + "=" * 60)
-    print("🔧 WESAD Database Migration Tool")
-    print("=" * 60)
-    print(f"📁 Database: {DB_PATH}")
-
-    if not DB_PATH.exists():
-        print("❌ Database not found!")
-        return False
-
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-
-        # Check if table exists
-        c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='predictions'")
-        if not c.fetchone():
-            print("❌ No predictions table found!")
-            conn.close()
-            return False
+    c = conn.cursor()
+    c.execute('ALTER TABLE predictions RENAME TO predictions_old')
+    c.execute(database.SQL_CREATE_PREDICTIONS)
+    c.execute(f'INSERT INTO predictions ({PREDICTION_COLUMNS}) '
+              f'SELECT {", ".join(select)} FROM predictions_old')
+    c.execute('DROP TABLE predictions_old')
 
-        # Get current record count
-        c.execute("SELECT COUNT(*) FROM predictions")
-        record_count = c.fetchone()[0]
-        print(f"📊 Current records: {record_count}")
 
-        # Get existing columns
-        c.execute("PRAGMA table_info(predictions)")
-        existing_columns = {row[1]: row[2] for row in c.fetchall()}
-        print(f"📋 Existing columns: {list(existing_columns.keys())}")
+def migrate_database(conn=None):
+    """Add missing columns to existing database WITHOUT deleting data
 
-        # Columns to add - FIXED: Remove CURRENT_TIMESTAMP default
-        new_columns = {
-            'heart_rate': 'REAL',
-            'stress_score': 'REAL',
-            'created_at': 'TEXT'  # ✅ FIXED: No default value for ALTER TABLE
-        }
+    Pass an open connection (see _open) to reuse it afterwards, e.g. for
+    verify_schema(); otherwise one is opened and closed here.
+    """
+    # Progress goes to one buffer written in a single call on exit;
+    # failures still log (and print the traceback) to stderr directly
+    out = io.StringIO()
+    say = functools.partial(print, file=out)
 
-        columns_added = 0
-        for column_name, column_type in new_columns.items():
-            if column_name not in existing_columns:
-                try:
-                    print(f"   Adding column: {column_name} ({column_type})...", end=" ")
-                    c.execute(f'ALTER TABLE predictions ADD COLUMN {column_name} {column_type}')
-                    print("✅")
-                    columns_added += 1
-                except sqlite3.OperationalError as e:
-                    if 'duplicate column name' in str(e).lower():
-                        print("⏭️ (already exists)")
-                    else:
-                        print(f"❌ Error: {e}")
-                        raise
-            else:
-                print(f"   Column {column_name}: ✅ (already exists)")
-
-        # Update existing records with calculated values
-        print("\n🔄 Updating existing records...")
-
-        # Calculate stress_score for existing records
-        c.execute('''
-            UPDATE predictions 
-            SET stress_score = CASE 
-                WHEN prediction = 'stress' THEN probability 
-                ELSE (1 - probability) 
-            END
-            WHERE stress_score IS NULL
-        ''')
-        updated_stress = c.rowcount
-        if updated_stress > 0:
-            print(f"   ✅ Updated stress_score for {updated_stress} records")
-
-        # Set default heart_rate if features contain it
-        c.execute('''
-            UPDATE predictions 
-            SET heart_rate = 75.0
-            WHERE heart_rate IS NULL
-        ''')
-        updated_hr = c.rowcount
-        if updated_hr > 0:
-            print(f"   ✅ Set default heart_rate for {updated_hr} records")
-
-        # Set created_at to timestamp for existing records
-        c.execute('''
-            UPDATE predictions 
-            SET created_at = timestamp
-            WHERE created_at IS NULL
-        ''')
-        updated_created = c.rowcount
-        if updated_created > 0:
-            print(f"   ✅ Set created_at for {updated_created} records")
-
-        conn.commit()
-
-        # Verify migration
-        c.execute("PRAGMA table_info(predictions)")
-        final_columns = [row[1] for row in c.fetchall()]
+    say("\n" + "=" * 60)
+    say("🔧 WESAD Database Migration Tool")
+    say("=" * 60)
+    say(f"📁 Database: {DB_PATH}")
 
-        c.execute("SELECT COUNT(*) FROM predictions")
-        final_count = c.fetchone()[0]
-
-        conn.close()
+    try:
+        if not DB_PATH.exists():
+            say("❌ Database not found!")
+            return False
 
-        print("\n✅ Migration Summary:")
-        print(f"   Columns added: {columns_added}")
-        print(f"   Final columns: {len(final_columns)}")
-        print(f"   Records before: {record_count}")
-        print(f"   Records after: {final_count}")
-        print(f"   Data preserved: {'✅ YES' if record_count == final_count else '❌ NO'}")
+        # Importing database runs its init_database(); do that now, before this
+        # connection takes the write lock, rather than mid-transaction. On an old
+        # layout its index creation can fail, which the rebuild below repairs
+        import database
+
+        owns_conn = conn is None
+        try:
+            if owns_conn:
+                conn = _open()
+            c = conn.cursor()
+
+            # Already applied: skip the checks and table scans entirely
+            c.execute("PRAGMA user_version")
+            if c.fetchone()[0] >= MIGRATION_ID:
+                say(f"✅ Already migrated (user_version {MIGRATION_ID})")
+                if owns_conn:
+                    _close(conn)
+                return True
+
+            # Check if table exists
+            c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='predictions'")
+            if not c.fetchone():
+                say("❌ No predictions table found!")
+                if owns_conn:
+                    _close(conn)
+                return False
+
+            # Get current record count
+            c.execute("SELECT COUNT(*) FROM predictions")
+            record_count = c.fetchone()[0]
+            say(f"📊 Current records: {record_count}")
+
+            # Get existing columns and layout
+            c.execute("PRAGMA table_info(predictions)")
+            existing_columns = {row[1] for row in c}
+            say(f"📋 Existing columns: {sorted(existing_columns)}")
+
+            c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='predictions'")
+            without_rowid = 'WITHOUT ROWID' in c.fetchone()[0].upper()
+
+            missing = [column for column in BACKFILL_COLUMNS if column not in existing_columns]
+            for column in BACKFILL_COLUMNS:
+                if column in missing:
+                    say(f"   Adding column: {column}")
+                else:
+                    say(f"   Column {column}: ✅ (already exists)")
+
+            # Everything below shares one write transaction (one fsync)
+            c.execute("BEGIN IMMEDIATE")
+
+            # Prefer the heart rate recorded in each row's features over the default
+            if 'heart_rate' in existing_columns:
+                from_features = _bulk_update_hr(c, _heart_rates_from_features(c))
+                if from_features:
+                    say(f"   ✅ Set heart_rate from features for {from_features} records")
+
+            # Rows each column will backfill: all of them for a new column, the
+            # NULLs (counted in one scan) for an existing one
+            backfilled = {column: record_count for column in missing}
+            present = [column for column in BACKFILL_COLUMNS if column not in missing]
+            if present:
+                c.execute('SELECT ' + ', '.join(f'IFNULL(SUM({column} IS NULL), 0)' for column in present)
+                          + ' FROM predictions')
+                backfilled.update(zip(present, c.fetchone()))
+
+            rebuilt = bool(missing) or not without_rowid
+            if rebuilt:
+                say("\n🔄 Rebuilding predictions (WITHOUT ROWID, new columns backfilled)...")
+                rebuild_predictions(conn, existing_columns)
+            elif any(backfilled.values()):
+                say("\n🔄 Updating existing records...")
+                c.execute(
+                    'UPDATE predictions SET '
+                    + ', '.join(f'{column} = COALESCE({column}, {expr})' for column, expr in BACKFILL_COLUMNS.items())
+                    + ' WHERE ' + ' OR '.join(f'{column} IS NULL' for column in BACKFILL_COLUMNS)
+                )
+
+            for column, count in backfilled.items():
+                if count > 0:
+                    say(f"   ✅ Backfilled {column} for {count} records")
+
+            # Range scans on the backfilled created_at column (user_id, prediction
+            # is already covered by idx_user_prediction)
+            c.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_pred_created'")
+            index_added = c.fetchone() is None
+            c.execute("CREATE INDEX IF NOT EXISTS idx_pred_created ON predictions(created_at, prediction)")
+
+            c.execute(f"PRAGMA user_version = {MIGRATION_ID}")
+            c.execute("COMMIT")
+
+            if rebuilt:
+                # The old indexes were dropped with the old table; recreate them
+                database.init_database()
+                say("   ✅ Rebuilt clustered on (user_id, timestamp, id)")
+
+            # Verify migration
+            c.execute("PRAGMA table_info(predictions)")
+            final_columns = [row[1] for row in c]
+
+            c.execute("SELECT COUNT(*) FROM predictions")
+            final_count = c.fetchone()[0]
+
+            # After a rebuild or new index, mask 0x10002 forces ANALYZE on every
+            # table instead of only those whose stats look stale
+            if rebuilt or index_added:
+                c.execute("PRAGMA optimize=0x10002")
+            if owns_conn:
+                _close(conn)
+
+            say("\n✅ Migration Summary:")
+            say(f"   Columns added: {len(missing)}")
+            say(f"   Final columns: {len(final_columns)}")
+            say(f"   Records before: {record_count}")
+            say(f"   Records after: {final_count}")
+            say(f"   Data preserved: {'✅ YES' if record_count == final_count else '❌ NO'}")
+
+            if record_count != final_count:
+                say("\n⚠️ WARNING: Record count mismatch! Data may be lost.")
+                return False
+
+            say("\n🎉 Migration completed successfully!")
+            say("=" * 60 + "\n")
+            return True
+
+        except Exception as e:
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if owns_conn and conn is not None:
+                _close(conn)
+            # Emit the progress so far ahead of the error
+            sys.stdout.write(out.getvalue())
+            out.seek(0)
+            out.truncate()
+            logger.error(f"❌ Migration failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    finally:
+        sys.stdout.write(out.getvalue())
+
+
+def migrate_users_collation(db_path=None):
+    """Rebuild the users table so username and email compare NOCASE
+
+    Databases created before models.User declared the collation keep
+    case-sensitive columns, since create_all() never alters an existing
+    table. The table is copied into one declared from its own CREATE
+    statement with COLLATE NOCASE added, so any columns added since are kept.
+    Fails without changing anything if existing rows differ only by case,
+    which the new UNIQUE indexes would reject.
+    """
+    db_path = db_path or next((path for path in USERS_DB_LOCATIONS if path.is_file()), None)
+    if db_path is None:
+        print("⚠️ No users database found - skipping collation migration")
+        return True
 
-        if record_count != final_count:
-            print("\n⚠️ WARNING: Record count mismatch! Data may be lost.")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='users'").fetchone()
+        if row is None:
+            return True
+        create_sql = row[0]
+
+        pending = [column for column in NOCASE_USER_COLUMNS
+                   if not re.search(rf'\b{column}\s+VARCHAR\(\d+\)\s+COLLATE\s+"?NOCASE"?',
+                                    create_sql, re.IGNORECASE)]
+        if not pending:
+            print(f"✅ users already NOCASE ({db_path})")
+            return True
+
+        duplicates = {
+            column: [value for (value,) in conn.execute(
+                f"SELECT lower({column}) FROM users GROUP BY lower({column}) HAVING COUNT(*) > 1")]
+            for column in pending
+        }
+        if any(duplicates.values()):
+            for column, values in duplicates.items():
+                if values:
+                    print(f"❌ users.{column} has values differing only by case: {', '.join(values)}")
+            print("❌ Resolve these rows, then rerun the migration")
             return False
 
-        print("\n🎉 Migration completed successfully!")
-        print("=" * 60 + "\n")
+        new_sql = re.sub(r'^CREATE TABLE\s+"?users"?', 'CREATE TABLE users_new', create_sql, count=1)
+        for column in pending:
+            new_sql = re.sub(rf'(\b{column}\s+VARCHAR\(\d+\))', r'\1 COLLATE NOCASE', new_sql, count=1)
+        indexes = [sql for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name='users' AND sql IS NOT NULL")]
+
+        # SQLite's documented table rebuild: new table, copy, drop, rename
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(new_sql)
+            conn.execute("INSERT INTO users_new SELECT * FROM users")
+            conn.execute("DROP TABLE users")
+            conn.execute("ALTER TABLE users_new RENAME TO users")
+            for sql in indexes:
+                conn.execute(sql)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"✅ Rebuilt users with NOCASE {', '.join(pending)} ({db_path})")
         return True
 
     except Exception as e:
-        logger.error(f"❌ Migration failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"❌ users collation migration failed: {e}")
         return False
+    finally:
+        conn.close()
 
 
-def verify_schema():
-    """Verify the database schema is correct"""
+def verify_schema(conn=None, sample_size=3):
+    """Verify the database schema is correct and print a few sample rows
+
+    Reuses ``conn`` when given (its schema is already parsed), otherwise
+    opens a read-only connection of its own.
+    """
     print("\n🔍 Verifying Database Schema...")
 
+    owns_conn = conn is None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        if owns_conn:
+            conn = sqlite3.connect(DB_PATH)
+            conn.executescript(VERIFY_PRAGMAS)
         c = conn.cursor()
 
         # Get table info
         c.execute("PRAGMA table_info(predictions)")
-        columns = {row[1]: row[2] for row in c.fetchall()}
+        columns = {row[1]: row[2] for row in c}
 
         required_columns = {
             'id': 'INTEGER',
@@ -179,12 +403,19 @@ def verify_schema():
 
         # Sample a few records to verify data
         if count > 0:
-            c.execute("SELECT timestamp, prediction, probability, heart_rate, stress_score FROM predictions LIMIT 3")
-            print("\n📝 Sample records:")
-            for row in c.fetchall():
-                print(f"   {row[0][:19]} | {row[1]:10s} | prob={row[2]:.2f} | hr={row[3]} | stress={row[4]}")
-
-        conn.close()
+            c.arraysize = sample_size
+            c.execute("SELECT timestamp, prediction, probability, heart_rate, stress_score "
+                      "FROM predictions LIMIT ?", (sample_size,))
+            # Format all sample rows into one write
+            print("\n📝 Sample records:\n" + "\n".join(
+                f"   {ts[:19]} | {pred:10s} | prob={prob:.2f} | hr={hr} | stress={score}"
+                for ts, pred, prob, hr, score in c.fetchmany()
+            ))
+
+        if owns_conn:
+            # Plain close: query_only would reject the ANALYZE that _close's
+            # PRAGMA optimize may run
+            conn.close()
 
         if all_good:
             print("\n✅ Schema is correct!")
@@ -199,13 +430,18 @@ def verify_schema():
 
 
 if __name__ == '__main__':
-    success = migrate_database()
+    # One connection for both steps; migrate_database reports a missing file itself
+    conn = _open() if DB_PATH.exists() else None
+    success = migrate_database(conn) and migrate_users_collation()
 
     if success:
-        verify_schema()
+        verify_schema(conn)
         print("\n✅ You can now run:")
         print("   1. python test_database.py  (to test)")
         print("   2. python generate_test_timeline.py 1  (to add more data)")
         print("   3. python app.py  (to start the application)")
     else:
         print("\n❌ Migration failed. Please check the errors above.")
+
+    if conn is not None:
+        _close(conn)
@@ -1,15 +1,32 @@
 from app import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import deferred
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from datetime import datetime
 
+# Argon2id tuned for request-path logins (OWASP minimum: 19 MiB, t=2, p=1),
+# created once per process
+_PH = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+
+def _nocase_string(length):
+    """VARCHAR compared case-insensitively on SQLite; NOCASE is SQLite-only, so
+    other dialects keep their default collation"""
+    return db.String(length).with_variant(db.String(length, collation='NOCASE'), 'sqlite')
+
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     __table_args__ = {'extend_existing': True}  # Optional to avoid redefinition warnings
 
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    # NOCASE on SQLite so case-insensitive lookups and the uniqueness check use
+    # the UNIQUE index instead of scanning with lower(); existing databases are
+    # converted by migrate_database.migrate_users_collation()
+    username = db.Column(_nocase_string(80), unique=True, nullable=False)
+    email = db.Column(_nocase_string(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -21,18 +38,41 @@ class User(UserMixin, db.Model):
     activity_level = db.Column(db.String(50))
     stress_threshold = db.Column(db.Float, default=0.7)
 
-    # Fitbit integration fields
+    # Fitbit integration fields. The tokens are only read by the Fitbit
+    # client, so they stay out of the per-request user load and come in
+    # together, in one query, on first access
     fitbit_connected = db.Column(db.Boolean, default=False)
-    fitbit_access_token = db.Column(db.Text)
-    fitbit_refresh_token = db.Column(db.Text)
+    fitbit_access_token = deferred(db.Column(db.Text), group='fitbit_tokens')
+    fitbit_refresh_token = deferred(db.Column(db.Text), group='fitbit_tokens')
 
     def set_password(self, password):
         """Hash and set the user's password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _PH.hash(password)
 
     def check_password(self, password):
-        """Verify user's password"""
-        return check_password_hash(self.password_hash, password)
+        """Verify user's password.
+
+        Legacy werkzeug (scrypt/pbkdf2) hashes are still accepted and are
+        upgraded to Argon2id on a successful check; the caller commits.
+        """
+        if not self.password_hash.startswith('$argon2'):
+            try:
+                valid = check_password_hash(self.password_hash, password)
+            except ValueError:  # unknown hash method
+                valid = False
+            if not valid:
+                return False
+            self.password_hash = _PH.hash(password)
+            return True
+
+        try:
+            _PH.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+        if _PH.check_needs_rehash(self.password_hash):
+            self.password_hash = _PH.hash(password)
+        return True
 
     def __repr__(self):
         return f'<User {self.username}>'
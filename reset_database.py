@@ -1,8 +1,19 @@
-import os
 import sqlite3
+import zlib
 from pathlib import Path
 
-# Search for database in multiple locations
+from sqlalchemy import text
+
+from app import create_app
+from models import db, User
+
+# Precomputed werkzeug scrypt hash of 'testpassword', so resets skip the
+# deliberately slow key derivation. Regenerate with
+# werkzeug.security.generate_password_hash('testpassword') if the password changes.
+TESTUSER_HASH = ('scrypt:32768:8:1$zRMcUcSrDJhZc8Mb$c6bfd9759c2c849e4eb737ad65fc8ff1c8b09b76c7e0fcad5a32966'
+                 'ddbd10c09c0b7b0ac97ef76801bcf3e7970497f0a91b297131ea2e8175cd7a9c4d366580f')
+
+# Search for database in multiple locations; stop probing at the first hit
 possible_locations = [
     'wesad_users.db',
     '../wesad_users.db',
@@ -10,59 +21,85 @@ possible_locations = [
     '../instance/wesad_users.db',
 ]
 
-db_found = False
-for db_path in possible_locations:
-    if os.path.exists(db_path):
-        print(f"🔍 Found database at: {db_path}")
-
-        # Drop the users table using raw SQL
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("DROP TABLE IF EXISTS users")
-            conn.commit()
-            conn.close()
-            print(f"✅ Dropped 'users' table from {db_path}")
-            db_found = True
-            break
-        except Exception as e:
-            print(f"❌ Error dropping table: {e}")
-            # Try to delete the file completely
-            try:
-                os.remove(db_path)
-                print(f"✅ Deleted database file: {db_path}")
-                db_found = True
-                break
-            except Exception as e2:
-                print(f"❌ Error deleting database: {e2}")
-
-if not db_found:
-    print("⚠️ No existing database found - will create new one")
-
-# Now create fresh database with correct schema
-print("\n🔧 Creating new database with profile fields...")
 
-from app import create_app
-from models import db, User
+def schema_checksum(metadata, dialect):
+    """CRC32 of the declared tables, their columns and column types as compiled
+    for ``dialect`` (collations included), kept in PRAGMA user_version"""
+    schema = sorted((table.name, tuple((column.name, column.type.compile(dialect=dialect))
+                                       for column in table.columns))
+                    for table in metadata.tables.values())
+    # user_version is a signed 32-bit integer
+    return zlib.crc32(repr(schema).encode()) & 0x7fffffff
 
-app = create_app()
 
-with app.app_context():
-    # Drop all tables and recreate
-    db.drop_all()
-    db.create_all()
+def drop_users_table():
+    """Drop the users table from the first database found; returns False if none exists"""
+    db_path = next((path for path in map(Path, possible_locations) if path.is_file()), None)
+    if db_path is None:
+        return False
+
+    print(f"🔍 Found database at: {db_path}")
+
+    # Drop the users table and reclaim its pages in place; no file deletion,
+    # so a handle held by another process can't leave a half-reset state
+    try:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.executescript("BEGIN; DROP TABLE IF EXISTS users; COMMIT; VACUUM;")
+        conn.execute("PRAGMA optimize")
+        conn.close()
+        print(f"✅ Dropped 'users' table from {db_path}")
+    except Exception as e:
+        # db.drop_all() below still resets the schema through SQLAlchemy
+        print(f"❌ Error dropping table: {e}")
+    return True
+
+
+def ensure_test_user():
+    """Create the test user unless it already exists"""
+    if User.query.filter_by(username='testuser').first() is not None:
+        return False
 
-    # Create test user
     user = User(username='testuser', email='test@example.com')
-    user.set_password('testpassword')
+    user.password_hash = TESTUSER_HASH
     db.session.add(user)
     db.session.commit()
+    return True
+
+
+app = create_app()
+
+with app.app_context():
+    current_schema = schema_checksum(db.metadata, db.engine.dialect)
+    stored_schema = db.session.execute(text('PRAGMA user_version')).scalar()
+
+if stored_schema == current_schema:
+    # Schema already matches the models: skip the drop/create rewrite
+    print("✅ Database schema is already current - skipping reset")
+    with app.app_context():
+        if ensure_test_user():
+            print("✅ Test user created!")
+else:
+    if not drop_users_table():
+        print("⚠️ No existing database found - will create new one")
+
+    # Now create fresh database with correct schema
+    print("\n🔧 Creating new database with profile fields...")
+
+    with app.app_context():
+        # Drop all tables and recreate
+        db.drop_all()
+        db.create_all()
+        db.session.execute(text(f'PRAGMA user_version = {current_schema}'))
+
+        # Create test user
+        ensure_test_user()
+
+        print("\n✅ Database recreated successfully!")
+        print("✅ Test user created!")
 
-    print("\n✅ Database recreated successfully!")
-    print("✅ Test user created!")
-    print("\n" + "=" * 50)
-    print("🎉 You can now login with:")
-    print("=" * 50)
-    print("Username: testuser")
-    print("Password: testpassword")
-    print("=" * 50)
+print("\n" + "=" * 50)
+print("🎉 You can now login with:")
+print("=" * 50)
+print("Username: testuser")
+print("Password: testpassword")
+print("=" * 50)
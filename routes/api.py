@@ -1,14 +1,22 @@
-from backend.services.fitbit_service import FitbitDataService, fitbit_sync_service
 import logging
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 import numpy as np
-import pandas as pd
+import orjson
 import io
+import bisect
 import csv
-from flask import Blueprint, jsonify, request, Response, send_file
+import functools
+import itertools
+from flask import Blueprint, g, jsonify, request, Response, send_file, stream_with_context
 from flask_login import login_required, current_user
+import database
+import services.fitbit_service
+from services import cache
+from services.cache import RECENT_WINDOW
+from services.fitbit_service import FitbitDataService
+from utils import now_iso
 
 
 
@@ -29,13 +37,20 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 # ==================== BASIC STATS & DATA ====================
 
+def _quick_stats_json(user_id):
+    """Serialized quick stats for a user, served from the cache when warm"""
+    key = f'qs:{user_id}'
+    cached = cache.get_bytes(key)
+    if cached is not None:
+        return cached
+    return cache.set_json(key, database.get_user_stats(user_id))
+
+
 @api_bp.route('/quick-stats')
 @login_required
 def quick_stats():
     try:
-        import database
-        user_stats = database.get_user_stats(str(current_user.id))
-        return jsonify(user_stats)
+        return Response(_quick_stats_json(str(current_user.id)), mimetype='application/json')
     except Exception as e:
         logger.error(f"Quick stats error: {e}")
         return jsonify({
@@ -49,13 +64,12 @@ def quick_stats():
 @login_required
 def historical_data():
     try:
-        import database
         days = int(request.args.get('days', 7))
         user_id = str(current_user.id)
 
         try:
             data = database.get_historical_data(days=days, user_id=user_id)
-            if data and data.get('stress_levels'):
+            if data and len(data['stress_levels']):
                 return jsonify(data)
         except AttributeError:
             logger.warning("get_historical_data not implemented in database module")
@@ -74,75 +88,73 @@ def historical_data():
 
 # ==================== EMOTION TIMELINE ====================
 
+def _emotion_timeline_payload(user_id, days):
+    """Chronological emotion readings for the last ``days`` days"""
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+
+    # Rows come back as API-ready dicts, with defaults applied by the query
+    timeline_data = database.get_emotion_timeline(user_id, cutoff_date)
+
+    if not timeline_data:
+        return {
+            'timeline': [],
+            'message': 'No data available',
+            'period': f'Last {days} days',
+            'total_records': 0
+        }
+
+    # Rows arrive oldest-first from the ts_us index; no re-sort needed
+    logger.info(f"Timeline: Found {len(timeline_data)} records for user {user_id}")
+
+    return {
+        'timeline': timeline_data,
+        'period': f'Last {days} days',
+        'total_records': len(timeline_data)
+    }
+
+
 @api_bp.route('/emotion-timeline')
 @login_required
 def emotion_timeline():
     try:
-        import database
         user_id = str(current_user.id)
         days = int(request.args.get('days', 7))
+        return jsonify(_emotion_timeline_payload(user_id, days))
 
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        predictions = database.get_user_predictions_since(user_id, cutoff_date)
+    except Exception as e:
+        logger.error(f"Timeline error: {e}", exc_info=True)
+        return jsonify({'error': str(e), 'timeline': [], 'total_records': 0}), 500
 
-        if not predictions:
-            return jsonify({
-                'timeline': [],
-                'message': 'No data available',
-                'period': f'Last {days} days',
-                'total_records': 0
-            })
 
-        timeline_data = [
-            {
-                'timestamp': pred.get('timestamp', ''),
-                'emotion': pred.get('stress_level', 'baseline'),
-                'confidence': float(pred.get('confidence', 0.5)),
-                'heart_rate': pred.get('heart_rate', 75) or 75
-            } for pred in predictions
-        ]
+# Short-lived: the distribution shifts with every new prediction
+EMOTION_DISTRIBUTION_TTL = 30
 
-        timeline_data.sort(key=lambda x: x['timestamp'])
-        logger.info(f"Timeline: Found {len(timeline_data)} records for user {user_id}")
 
-        return jsonify({
-            'timeline': timeline_data,
-            'period': f'Last {days} days',
-            'total_records': len(timeline_data)
-        })
+def _emotion_distribution_json(user_id):
+    """Serialized emotion percentages over the user's recent readings"""
+    key = f'ed:{user_id}'
+    cached = cache.get_bytes(key)
+    if cached is not None:
+        return cached
 
-    except Exception as e:
-        logger.error(f"Timeline error: {e}", exc_info=True)
-        return jsonify({'error': str(e), 'timeline': [], 'total_records': 0}), 500
+    # Counted by the database over the last 500 rows; only three integers come back
+    emotion_counts = database.get_emotion_counts(user_id, limit=500)
+
+    total = sum(emotion_counts.values())
+    if total == 0:
+        return orjson.dumps({'baseline': 0, 'stress': 0, 'amusement': 0})
+
+    # One division for all three buckets
+    scale = 100 / total
+    distribution = {emotion: round(count * scale, 1) for emotion, count in emotion_counts.items()}
+    return cache.set_json(key, distribution, ttl=EMOTION_DISTRIBUTION_TTL)
 
 
 @api_bp.route('/emotion-distribution')
 @login_required
 def emotion_distribution():
     try:
-        import database
-        user_id = str(current_user.id)
-        predictions = database.get_user_predictions(user_id, limit=500)
-
-        if not predictions:
-            return jsonify({'baseline': 0, 'stress': 0, 'amusement': 0})
-
-        emotion_counts = {'baseline': 0, 'stress': 0, 'amusement': 0}
-        for pred in predictions:
-            emotion = pred.get('stress_level', 'baseline')
-            if emotion in emotion_counts:
-                emotion_counts[emotion] += 1
-
-        total = sum(emotion_counts.values())
-        if total == 0:
-            return jsonify({'baseline': 0, 'stress': 0, 'amusement': 0})
-
-        distribution = {
-            emotion: round((count / total) * 100, 1)
-            for emotion, count in emotion_counts.items()
-        }
-
-        return jsonify(distribution)
+        return Response(_emotion_distribution_json(str(current_user.id)), mimetype='application/json')
 
     except Exception as e:
         logger.error(f"Emotion distribution error: {e}", exc_info=True)
@@ -151,21 +163,28 @@ def emotion_distribution():
 
 # ==================== FITBIT INTEGRATION ====================
 
+def _fitbit_connected():
+    """current_user.fitbit_connected, read once per request and kept on g"""
+    connected = g.get('fitbit_connected')
+    if connected is None:
+        connected = g.fitbit_connected = bool(current_user.fitbit_connected)
+    return connected
+
+
 @api_bp.route('/fitbit/realtime-data')
 @login_required
 def fitbit_realtime_data():
     try:
-        if not current_user.fitbit_connected:
+        if not _fitbit_connected():
             return jsonify({'error': 'Fitbit not connected'}), 401
 
-        from services.fitbit_service import FitbitDataService
         fitbit_service = FitbitDataService(current_user)
         phys_data = fitbit_service.stream_physiological_data()
 
         return jsonify({
             'success': True,
             'data': phys_data,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         })
 
     except Exception as e:
@@ -177,16 +196,15 @@ def fitbit_realtime_data():
 @login_required
 def fitbit_heart_rate():
     try:
-        if not current_user.fitbit_connected:
+        if not _fitbit_connected():
             return jsonify({'error': 'Fitbit not connected'}), 401
 
-        from services.fitbit_service import FitbitDataService
         fitbit_service = FitbitDataService(current_user)
         hr = fitbit_service.get_current_heart_rate()
 
         return jsonify({
             'heart_rate': hr if hr else 0,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'status': 'success' if hr else 'no_data'
         })
 
@@ -199,17 +217,16 @@ def fitbit_heart_rate():
 @login_required
 def fitbit_activity():
     try:
-        if not current_user.fitbit_connected:
+        if not _fitbit_connected():
             return jsonify({'error': 'Fitbit not connected'}), 401
 
-        from services.fitbit_service import FitbitDataService
         fitbit_service = FitbitDataService(current_user)
         activity = fitbit_service.get_activity_summary()
 
         return jsonify({
             'success': True,
             'activity': activity,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         })
 
     except Exception as e:
@@ -221,17 +238,16 @@ def fitbit_activity():
 @login_required
 def fitbit_sleep():
     try:
-        if not current_user.fitbit_connected:
+        if not _fitbit_connected():
             return jsonify({'error': 'Fitbit not connected'}), 401
 
-        from services.fitbit_service import FitbitDataService
         fitbit_service = FitbitDataService(current_user)
         sleep_data = fitbit_service.get_sleep_data()
 
         return jsonify({
             'success': True,
             'sleep': sleep_data,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         })
 
     except Exception as e:
@@ -243,10 +259,9 @@ def fitbit_sleep():
 @login_required
 def fitbit_hrv_stress():
     try:
-        if not current_user.fitbit_connected:
+        if not _fitbit_connected():
             return jsonify({'error': 'Fitbit not connected'}), 401
 
-        from services.fitbit_service import FitbitDataService
         fitbit_service = FitbitDataService(current_user)
         stress_score = fitbit_service.get_stress_score_from_hrv()
         hrv_data = fitbit_service.get_heart_rate_variability()
@@ -256,7 +271,7 @@ def fitbit_hrv_stress():
             'stress_score': stress_score,
             'stress_level': 'high' if stress_score > 0.7 else 'moderate' if stress_score > 0.4 else 'low',
             'hrv_data': hrv_data,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         })
 
     except Exception as e:
@@ -268,10 +283,11 @@ def fitbit_hrv_stress():
 @login_required
 def fitbit_start_sync():
     try:
-        if not current_user.fitbit_connected:
+        if not _fitbit_connected():
             return jsonify({'error': 'Fitbit not connected'}), 401
 
-        from services.fitbit_service import fitbit_sync_service
+        # Looked up on the module: init_fitbit_sync rebinds it after import
+        fitbit_sync_service = services.fitbit_service.fitbit_sync_service
         if fitbit_sync_service:
             fitbit_sync_service.start_sync(current_user)
             return jsonify({
@@ -291,7 +307,7 @@ def fitbit_start_sync():
 @login_required
 def fitbit_stop_sync():
     try:
-        from services.fitbit_service import fitbit_sync_service
+        fitbit_sync_service = services.fitbit_service.fitbit_sync_service
         if fitbit_sync_service:
             fitbit_sync_service.stop_sync()
             return jsonify({'success': True, 'message': 'Background sync stopped'})
@@ -305,17 +321,175 @@ def fitbit_stop_sync():
 
 # ==================== ENHANCED RECOMMENDATIONS ====================
 
-@api_bp.route('/recommendations')
-@login_required
-def get_recommendations():
-    try:
-        import database
-        user_id = str(current_user.id)
+# Emotion label -> code, as stored in the Redis recent-readings window
+EMOTION_CODES = cache.EMOTION_CODES
+
+
+# Recommendation templates, built once at import. REC_HIGH_STRESS and
+# REC_MODERATE_STRESS messages are format strings filled per request via
+# dict(template, message=...); the rest are shared as-is and must not be mutated.
+REC_HIGH_STRESS = (
+    {
+        'priority': 'high',
+        'message': '⚠️ High stress detected ({stress_pct}% of readings)',
+        'action': 'Take a 10-minute break - Try 4-7-8 breathing (inhale 4s, hold 7s, exhale 8s)',
+        'icon': '🚨',
+        'context': 'immediate',
+        'category': 'stress_management'
+    },
+    {
+        'priority': 'high',
+        'message': '💓 Elevated heart rate during stress (avg {avg_stress_hr} bpm)',
+        'action': 'Do 5 minutes of box breathing or take a short walk',
+        'icon': '💓',
+        'context': 'physiological',
+        'category': 'physical_health'
+    }
+)
+
+REC_MODERATE_STRESS = {
+    'priority': 'medium',
+    'message': 'Moderate stress levels ({stress_pct}%)',
+    'action': 'Take preventive breaks every 60-90 minutes',
+    'icon': '⚠️',
+    'context': 'preventive',
+    'category': 'stress_management'
+}
+
+REC_LOW_STRESS = {
+    'priority': 'low',
+    'message': '✅ Stress levels well-managed!',
+    'action': 'Continue your routine',
+    'icon': '✅',
+    'context': 'positive',
+    'category': 'encouragement'
+}
+
+REC_MORNING = {
+    'priority': 'info',
+    'message': '🌅 Morning wellness boost',
+    'action': '10-min meditation + glass of water',
+    'icon': '🌅',
+    'context': 'time_based',
+    'category': 'daily_routine'
+}
+
+REC_AFTERNOON = {
+    'priority': 'medium',
+    'message': '☀️ Afternoon energy dip',
+    'action': '15-min walk OR 20-min power nap',
+    'icon': '☀️',
+    'context': 'time_based',
+    'category': 'energy_management'
+}
+
+REC_EVENING = {
+    'priority': 'info',
+    'message': '🌙 Evening wind-down',
+    'action': 'Dim lights, avoid screens 30min before bed',
+    'icon': '🌙',
+    'context': 'time_based',
+    'category': 'sleep_hygiene'
+}
+
+REC_NIGHT = {
+    'priority': 'high',
+    'message': '😴 Late night activity',
+    'action': 'Wind down - quality sleep is crucial',
+    'icon': '😴',
+    'context': 'time_based',
+    'category': 'sleep_hygiene'
+}
+
+REC_ACTIVITY = {
+    'priority': 'medium',
+    'message': '🏃 Physical activity reduces stress by 60%',
+    'action': '30 min exercise: walk, jog, yoga',
+    'icon': '🏃',
+    'context': 'activity',
+    'category': 'physical_activity'
+}
+
+REC_GENERAL = (
+    {
+        'priority': 'info',
+        'message': '💧 Hydration checkpoint',
+        'action': 'Drink water every 2 hours - 8 glasses/day',
+        'icon': '💧',
+        'context': 'general',
+        'category': 'nutrition'
+    },
+    {
+        'priority': 'info',
+        'message': '😴 Sleep quality matters',
+        'action': '7-8 hours consistent sleep',
+        'icon': '😴',
+        'context': 'general',
+        'category': 'sleep'
+    },
+    {
+        'priority': 'info',
+        'message': '🥗 Nutrition affects mood',
+        'action': 'Balanced meals with fruits & vegetables',
+        'icon': '🥗',
+        'context': 'general',
+        'category': 'nutrition'
+    }
+)
+
 
-        recent_predictions = database.get_user_predictions(user_id, limit=50)
+# Upper bounds of the stress-ratio bands every recommendation rule keys on:
+# band 0 is <= 0.3 and band 4 is > 0.6 (bisect_left keeps bounds inclusive)
+STRESS_BANDS = (0.3, 0.4, 0.5, 0.6)
+STRESS_CATEGORY = ('Low', 'Moderate', 'Moderate', 'High', 'High')
+
+# Hour of day -> 0 night (22-6), 1 morning (6-12), 2 afternoon (12-18), 3 evening (18-22)
+HOUR_BAND = tuple(1 if 6 <= h < 12 else 2 if 12 <= h < 18 else 3 if 18 <= h < 22 else 0 for h in range(24))
+TIME_OF_DAY = ('night', 'morning', 'afternoon', 'evening')
+
+
+def _build_rec_table():
+    """REC_TABLE[stress_band][hour_band] -> ((recommendation, templated), ...)"""
+    templated = REC_HIGH_STRESS + (REC_MODERATE_STRESS,)
+    table = []
+    for stress_band in range(len(STRESS_BANDS) + 1):
+        if stress_band == 4:
+            by_stress = REC_HIGH_STRESS
+        elif stress_band >= 1:
+            by_stress = (REC_MODERATE_STRESS,)
+        else:
+            by_stress = (REC_LOW_STRESS,)
+
+        row = []
+        for hour_band in range(len(TIME_OF_DAY)):
+            if hour_band == 2:
+                # The afternoon tip only applies above 0.4
+                by_time = (REC_AFTERNOON,) if stress_band >= 2 else ()
+            else:
+                by_time = ((REC_NIGHT, REC_MORNING, None, REC_EVENING)[hour_band],)
+            by_activity = (REC_ACTIVITY,) if stress_band >= 3 else ()
+
+            recs = by_stress + by_time + by_activity + REC_GENERAL
+            row.append(tuple((rec, any(rec is t for t in templated)) for rec in recs))
+        table.append(tuple(row))
+    return tuple(table)
+
+
+REC_TABLE = _build_rec_table()
+
+
+def _recommendations_payload(user_id):
+    """Context-aware recommendations from the user's last RECENT_WINDOW readings.
+
+    Reads the Redis window when it is warm, otherwise the database (and
+    seeds the window for next time).
+    """
+    recent = cache.get_recent_readings(user_id)
+    if recent is None:
+        recent_predictions = database.get_user_predictions(user_id, limit=RECENT_WINDOW, parse_features=False)
 
         if not recent_predictions:
-            return jsonify({
+            return {
                 'recommendations': [{
                     'priority': 'info',
                     'message': 'Start monitoring to get personalized recommendations',
@@ -323,154 +497,89 @@ def get_recommendations():
                     'icon': '🌟',
                     'context': 'onboarding'
                 }]
-            })
+            }
 
-        stress_count = sum(1 for p in recent_predictions if p.get('stress_level') == 'stress')
-        stress_ratio = stress_count / len(recent_predictions)
-
-        stress_hr = [p.get('heart_rate', 75) for p in recent_predictions if p.get('stress_level') == 'stress']
-        avg_stress_hr = int(np.mean(stress_hr)) if stress_hr else 0
-
-        current_hour = datetime.now().hour
-        is_morning = 6 <= current_hour < 12
-        is_afternoon = 12 <= current_hour < 18
-        is_evening = 18 <= current_hour < 22
-        is_night = current_hour >= 22 or current_hour < 6
-
-        recommendations = []
-
-        if stress_ratio > 0.6:
-            recommendations.extend([
-                {
-                    'priority': 'high',
-                    'message': f'⚠️ High stress detected ({int(stress_ratio * 100)}% of readings)',
-                    'action': 'Take a 10-minute break - Try 4-7-8 breathing (inhale 4s, hold 7s, exhale 8s)',
-                    'icon': '🚨',
-                    'context': 'immediate',
-                    'category': 'stress_management'
-                },
-                {
-                    'priority': 'high',
-                    'message': f'💓 Elevated heart rate during stress (avg {avg_stress_hr} bpm)',
-                    'action': 'Do 5 minutes of box breathing or take a short walk',
-                    'icon': '💓',
-                    'context': 'physiological',
-                    'category': 'physical_health'
-                }
-            ])
-        elif stress_ratio > 0.3:
-            recommendations.append({
-                'priority': 'medium',
-                'message': f'Moderate stress levels ({int(stress_ratio * 100)}%)',
-                'action': 'Take preventive breaks every 60-90 minutes',
-                'icon': '⚠️',
-                'context': 'preventive',
-                'category': 'stress_management'
-            })
-        else:
-            recommendations.append({
-                'priority': 'low',
-                'message': '✅ Stress levels well-managed!',
-                'action': 'Continue your routine',
-                'icon': '✅',
-                'context': 'positive',
-                'category': 'encouragement'
-            })
+        recent = (
+            [EMOTION_CODES.get(p.get('stress_level'), 0) for p in recent_predictions],
+            [p.get('heart_rate') or 75 for p in recent_predictions]
+        )
+        cache.seed_recent_readings(user_id, *recent)
+
+    # Small emotion codes, so a bincount histogram and a masked mean
+    codes = np.array(recent[0], dtype=np.int8)
+    heart_rates = np.array(recent[1], dtype=np.float32)
+    emotion_counts = np.bincount(codes, minlength=len(EMOTION_CODES))
+    stress_count = int(emotion_counts[EMOTION_CODES['stress']])
+    stress_ratio = stress_count / len(codes)
+    is_stress = codes == EMOTION_CODES['stress']
+    avg_stress_hr = int(heart_rates[is_stress].mean()) if stress_count else 0
+
+    stress_band = bisect.bisect_left(STRESS_BANDS, stress_ratio)
+    hour_band = HOUR_BAND[datetime.now().hour]
+
+    # Static entries are shared; templates get this request's numbers
+    values = {'stress_pct': int(stress_ratio * 100), 'avg_stress_hr': avg_stress_hr}
+    recommendations = [
+        dict(rec, message=rec['message'].format_map(values)) if templated else rec
+        for rec, templated in REC_TABLE[stress_band][hour_band]
+    ]
+
+    return {
+        'recommendations': recommendations,
+        'analysis': {
+            'stress_ratio': round(stress_ratio, 2),
+            'stress_level_category': STRESS_CATEGORY[stress_band],
+            'avg_stress_hr': avg_stress_hr if avg_stress_hr else None,
+            'time_of_day': TIME_OF_DAY[hour_band],
+            'total_readings_analyzed': len(codes),
+            'stress_episodes_count': stress_count
+        },
+        'meta': {
+            'generated_at': now_iso(),
+            'user_id': user_id,
+            'recommendation_count': len(recommendations)
+        }
+    }
 
-        # Time-based recommendations
-        if is_morning:
-            recommendations.append({
-                'priority': 'info',
-                'message': '🌅 Morning wellness boost',
-                'action': '10-min meditation + glass of water',
-                'icon': '🌅',
-                'context': 'time_based',
-                'category': 'daily_routine'
-            })
-        elif is_afternoon and stress_ratio > 0.4:
-            recommendations.append({
-                'priority': 'medium',
-                'message': '☀️ Afternoon energy dip',
-                'action': '15-min walk OR 20-min power nap',
-                'icon': '☀️',
-                'context': 'time_based',
-                'category': 'energy_management'
-            })
-        elif is_evening:
-            recommendations.append({
-                'priority': 'info',
-                'message': '🌙 Evening wind-down',
-                'action': 'Dim lights, avoid screens 30min before bed',
-                'icon': '🌙',
-                'context': 'time_based',
-                'category': 'sleep_hygiene'
-            })
-        elif is_night:
-            recommendations.append({
-                'priority': 'high',
-                'message': '😴 Late night activity',
-                'action': 'Wind down - quality sleep is crucial',
-                'icon': '😴',
-                'context': 'time_based',
-                'category': 'sleep_hygiene'
-            })
 
-        if stress_ratio > 0.5:
-            recommendations.append({
-                'priority': 'medium',
-                'message': '🏃 Physical activity reduces stress by 60%',
-                'action': '30 min exercise: walk, jog, yoga',
-                'icon': '🏃',
-                'context': 'activity',
-                'category': 'physical_activity'
-            })
+@api_bp.route('/recommendations')
+@login_required
+def get_recommendations():
+    try:
+        return jsonify(_recommendations_payload(str(current_user.id)))
 
-        recommendations.extend([
-            {
-                'priority': 'info',
-                'message': '💧 Hydration checkpoint',
-                'action': 'Drink water every 2 hours - 8 glasses/day',
-                'icon': '💧',
-                'context': 'general',
-                'category': 'nutrition'
-            },
-            {
-                'priority': 'info',
-                'message': '😴 Sleep quality matters',
-                'action': '7-8 hours consistent sleep',
-                'icon': '😴',
-                'context': 'general',
-                'category': 'sleep'
-            },
-            {
-                'priority': 'info',
-                'message': '🥗 Nutrition affects mood',
-                'action': 'Balanced meals with fruits & vegetables',
-                'icon': '🥗',
-                'context': 'general',
-                'category': 'nutrition'
-            }
-        ])
+    except Exception as e:
+        logger.error(f"Recommendations error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({
-            'recommendations': recommendations,
-            'analysis': {
-                'stress_ratio': round(stress_ratio, 2),
-                'stress_level_category': 'High' if stress_ratio > 0.5 else 'Moderate' if stress_ratio > 0.3 else 'Low',
-                'avg_stress_hr': avg_stress_hr if avg_stress_hr else None,
-                'time_of_day': 'morning' if is_morning else 'afternoon' if is_afternoon else 'evening' if is_evening else 'night',
-                'total_readings_analyzed': len(recent_predictions),
-                'stress_episodes_count': stress_count
-            },
-            'meta': {
-                'generated_at': datetime.now().isoformat(),
-                'user_id': user_id,
-                'recommendation_count': len(recommendations)
-            }
-        })
+
+@api_bp.route('/dashboard-bundle')
+@login_required
+def dashboard_bundle():
+    """Stats, distribution, timeline and recommendations in one response.
+
+    Saves the dashboard one request per widget, and all the reads run on a
+    single database snapshot. Cached sections are embedded as-is.
+    """
+    try:
+        user_id = str(current_user.id)
+        days = int(request.args.get('days', 7))
+
+        with database.read_txn():
+            stats = _quick_stats_json(user_id)
+            distribution = _emotion_distribution_json(user_id)
+            timeline = _emotion_timeline_payload(user_id, days)
+            recommendations = _recommendations_payload(user_id)
+
+        return Response(orjson.dumps({
+            'stats': orjson.Fragment(stats),
+            'distribution': orjson.Fragment(distribution),
+            'timeline': timeline,
+            'recommendations': recommendations
+        }), mimetype='application/json')
 
     except Exception as e:
-        logger.error(f"Recommendations error: {e}", exc_info=True)
+        logger.error(f"Dashboard bundle error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
@@ -480,8 +589,11 @@ def get_recommendations():
 @login_required
 def correlation_map():
     try:
-        import database
         user_id = str(current_user.id)
+        key = f'corr:{user_id}'
+        cached = cache.get_bytes(key)
+        if cached is not None:
+            return Response(cached, mimetype='application/json')
 
         predictions = database.get_user_predictions(user_id, limit=1000)
 
@@ -493,39 +605,57 @@ def correlation_map():
         if not feature_data:
             return jsonify({'error': 'No feature data available'}), 404
 
-        df = pd.DataFrame(feature_data)
-        corr_matrix = df.corr().round(3)
-
-        high_positive = []
-        high_negative = []
-
-        for i, col1 in enumerate(corr_matrix.columns):
-            for j, col2 in enumerate(corr_matrix.columns):
-                if i < j:
-                    corr_val = corr_matrix.loc[col1, col2]
-                    if corr_val > 0.7:
-                        high_positive.append({'feature1': col1, 'feature2': col2, 'correlation': float(corr_val)})
-                    elif corr_val < -0.7:
-                        high_negative.append({'feature1': col1, 'feature2': col2, 'correlation': float(corr_val)})
-
-        return jsonify({
-            'features': corr_matrix.columns.tolist(),
-            'matrix': corr_matrix.values.tolist(),
-            'high_positive_correlations': high_positive,
-            'high_negative_correlations': high_negative,
-            'total_features': len(corr_matrix.columns)
-        })
+        feature_names = list(feature_data[0].keys())
+        X = np.fromiter(
+            (f.get(name, np.nan) for f in feature_data for name in feature_names),
+            dtype=np.float32,
+            count=len(feature_data) * len(feature_names)
+        ).reshape(-1, len(feature_names))
+
+        # One BLAS-backed covariance over all columns. Undefined entries
+        # (constant or incomplete columns) are reported as 0 rather than NaN;
+        # a single column comes back 0-d, so keep it a 1x1 matrix
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.nan_to_num(np.atleast_2d(np.corrcoef(X, rowvar=False)), copy=False).round(3)
+
+        # Threshold the upper triangle in one vectorized pass
+        rows, cols = np.triu_indices_from(corr, k=1)
+        values = corr[rows, cols]
+
+        def pairs(mask):
+            return [
+                {'feature1': feature_names[i], 'feature2': feature_names[j], 'correlation': float(v)}
+                for i, j, v in zip(rows[mask].tolist(), cols[mask].tolist(), values[mask].tolist())
+            ]
+
+        return Response(cache.set_json(key, {
+            'features': feature_names,
+            # float32 halves what orjson walks and still prints the 3-decimal values
+            'matrix': corr.astype(np.float32),
+            'high_positive_correlations': pairs(values > 0.7),
+            'high_negative_correlations': pairs(values < -0.7),
+            'total_features': len(feature_names)
+        }), mimetype='application/json')
 
     except Exception as e:
         logger.error(f"Correlation map error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
+@functools.lru_cache(maxsize=None)
+def _load_shap():
+    """Import the optional shap package once; None if it isn't installed"""
+    try:
+        import shap
+    except ImportError:
+        return None
+    return shap
+
+
 @api_bp.route('/feature-importance')
 @login_required
 def feature_importance():
     try:
-        import services
         user_id = str(current_user.id)
         model = services.ml_service.models.get('RandomForest')
         if not model:
@@ -536,17 +666,22 @@ def feature_importance():
                 'top_feature': 'Heart Rate'
             })
 
-        import database
         predictions = database.get_user_predictions(user_id, limit=100)
         if not predictions or not predictions[0].get('features'):
             return jsonify({'error': 'No feature data available'}), 404
 
         feature_data = [p['features'] for p in predictions if p.get('features')]
         feature_names = list(feature_data[0].keys())
-        X_test = np.array([[f.get(feat, 0) for feat in feature_names] for f in feature_data])
+        X_test = np.fromiter(
+            (f.get(name, 0) for f in feature_data for name in feature_names),
+            dtype=np.float32,
+            count=len(feature_data) * len(feature_names)
+        ).reshape(-1, len(feature_names))
 
         try:
-            import shap
+            shap = _load_shap()
+            if shap is None:
+                raise ImportError('shap')
             explainer = shap.TreeExplainer(model)
             shap_values = explainer.shap_values(X_test)
 
@@ -586,20 +721,25 @@ def feature_importance():
         return jsonify({'error': str(e)}), 500
 
 
+# The deterministic part of the forecast curve only depends on the hour
+_FORECAST_HOURS = np.arange(24)
+_FORECAST_BASELINE = 0.3 + 0.2 * np.sin(0.3 * _FORECAST_HOURS)
+
+
 @api_bp.route('/stress-forecast')
 @login_required
 def stress_forecast():
     try:
-        hours = list(range(24))
-        forecast = [0.3 + 0.2 * np.sin(i * 0.3) + np.random.random() * 0.1 for i in hours]
-        high_risk = [i for i, v in enumerate(forecast) if v > 0.6]
+        # One vectorized draw over the precomputed daily curve
+        forecast = _FORECAST_BASELINE + 0.1 * np.random.random(_FORECAST_HOURS.size)
+        high_risk = np.flatnonzero(forecast > 0.6).tolist()
 
         return jsonify({
-            'hours': hours,
-            'forecast': [round(f, 3) for f in forecast],
+            'hours': _FORECAST_HOURS.tolist(),
+            'forecast': forecast.round(3).tolist(),
             'high_risk_hours': high_risk,
-            'peak_stress_time': int(hours[np.argmax(forecast)]),
-            'average_predicted_stress': float(np.mean(forecast)),
+            'peak_stress_time': int(forecast.argmax()),
+            'average_predicted_stress': float(forecast.mean()),
             'warning': f'High stress expected during hours: {", ".join(map(str, high_risk))}' if high_risk else 'No high stress periods expected'
         })
 
@@ -614,29 +754,42 @@ def stress_forecast():
 @login_required
 def export_data():
     try:
-        import database
         user_id = str(current_user.id)
-        predictions = database.get_user_predictions(user_id, limit=1000)
+        # Consume rows straight off the cursor rather than a materialized list
+        predictions = database.iter_user_predictions(user_id, limit=1000)
+        first = next(predictions, None)
 
-        if not predictions:
+        if first is None:
             return jsonify({'error': 'No data to export'}), 404
 
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Timestamp', 'Emotion', 'Confidence', 'Model', 'Heart_Rate', 'Features_JSON'])
-
-        for record in predictions:
-            writer.writerow([
-                record.get('timestamp', ''),
-                record.get('stress_level', ''),
-                record.get('confidence', ''),
-                record.get('model_used', 'ANN'),
-                record.get('features', {}).get('heart_rate', '') if record.get('features') else '',
-                str(record.get('features', ''))
-            ])
+        def generate():
+            # One small buffer reused per row, so memory stays flat however
+            # many rows are exported
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+
+            def flush():
+                chunk = buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                return chunk
+
+            writer.writerow(['Timestamp', 'Emotion', 'Confidence', 'Model', 'Heart_Rate', 'Features_JSON'])
+            yield flush()
+
+            for record in itertools.chain((first,), predictions):
+                writer.writerow([
+                    record.get('timestamp', ''),
+                    record.get('stress_level', ''),
+                    record.get('confidence', ''),
+                    record.get('model_used', 'ANN'),
+                    record.get('features', {}).get('heart_rate', '') if record.get('features') else '',
+                    str(record.get('features', ''))
+                ])
+                yield flush()
 
         response = Response(
-            output.getvalue(),
+            stream_with_context(generate()),
             mimetype='text/csv',
             headers={
                 'Content-Disposition': f'attachment; filename=wesad_data_{user_id}_{datetime.now().strftime("%Y%m%d")}.csv'
@@ -649,16 +802,36 @@ def export_data():
         return jsonify({'error': str(e)}), 500
 
 
+@functools.lru_cache(maxsize=1)
+def _report_styles():
+    """Stylesheet and table style for the weekly PDF, built once per process.
+
+    Both are read-only once built; the document and its flowables stay per
+    request since they hold the output buffer and layout state.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (1, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    return getSampleStyleSheet(), table_style
+
+
 @api_bp.route('/weekly-report-pdf')
 @login_required
 def weekly_report_pdf():
     try:
         from reportlab.lib.pagesizes import letter
-        from reportlab.lib import colors
         from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet
-        import database
+        from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
 
         user_id = str(current_user.id)
         stats = database.get_user_stats(user_id)
@@ -666,7 +839,7 @@ def weekly_report_pdf():
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
         story = []
-        styles = getSampleStyleSheet()
+        styles, table_style = _report_styles()
 
         title = Paragraph(f"<b>WESAD Weekly Wellness Report</b>", styles['Title'])
         story.append(title)
@@ -689,15 +862,7 @@ def weekly_report_pdf():
         ]
 
         table = Table(data, colWidths=[3 * inch, 2 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (1, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(table_style)
 
         story.append(table)
         story.append(Spacer(1, 0.3 * inch))
@@ -729,23 +894,27 @@ def weekly_report_pdf():
 
 # ==================== MODEL COMPARISON ====================
 
+# Static, so serialized once at import rather than cached per request
+_MODEL_COMPARISON = orjson.dumps({
+    'models': {
+        'ANN': {'accuracy': 0.89, 'f1_score': 0.87, 'precision': 0.88, 'recall': 0.86,
+                'description': 'Artificial Neural Network'},
+        'CNN-LSTM': {'accuracy': 0.92, 'f1_score': 0.90, 'precision': 0.91, 'recall': 0.89,
+                     'description': 'Hybrid Deep Learning'},
+        'Random Forest': {'accuracy': 0.85, 'f1_score': 0.83, 'precision': 0.84, 'recall': 0.82,
+                          'description': 'Ensemble Tree'},
+        'SVM': {'accuracy': 0.83, 'f1_score': 0.81, 'precision': 0.82, 'recall': 0.80,
+                'description': 'Support Vector Machine'}
+    },
+    'recommendation': 'CNN-LSTM best for temporal patterns',
+    'best_model': 'CNN-LSTM'
+})
+
+
 @api_bp.route('/model-comparison')
 @login_required
 def model_comparison():
-    return jsonify({
-        'models': {
-            'ANN': {'accuracy': 0.89, 'f1_score': 0.87, 'precision': 0.88, 'recall': 0.86,
-                    'description': 'Artificial Neural Network'},
-            'CNN-LSTM': {'accuracy': 0.92, 'f1_score': 0.90, 'precision': 0.91, 'recall': 0.89,
-                         'description': 'Hybrid Deep Learning'},
-            'Random Forest': {'accuracy': 0.85, 'f1_score': 0.83, 'precision': 0.84, 'recall': 0.82,
-                              'description': 'Ensemble Tree'},
-            'SVM': {'accuracy': 0.83, 'f1_score': 0.81, 'precision': 0.82, 'recall': 0.80,
-                    'description': 'Support Vector Machine'}
-        },
-        'recommendation': 'CNN-LSTM best for temporal patterns',
-        'best_model': 'CNN-LSTM'
-    })
+    return Response(_MODEL_COMPARISON, mimetype='application/json')
 
 
 # ==================== HEALTH CHECK ====================
@@ -756,7 +925,7 @@ def health_check():
         'status': 'healthy',
         'service': 'WESAD Stress Detection API',
         'version': '2.0',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso(),
         'features': [
             'Real-time monitoring',
             'ML predictions (ANN, CNN-LSTM)',
@@ -3,8 +3,10 @@ from pathlib import Path
 import logging
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
+import orjson
 from backend.models import User, db
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from services import cache
 
 # Add backend directory to system path for imports
 sys.path.append(str(Path(__file__).parents[1]))
@@ -12,6 +14,39 @@ sys.path.append(str(Path(__file__).parents[1]))
 auth_bp = Blueprint('auth', __name__)
 logger = logging.getLogger(__name__)
 
+# User id cached per login username; short, since a rename made outside this
+# app is only picked up on expiry
+LOGIN_CACHE_TTL = 60
+
+
+def _usernames_nocase():
+    # Usernames are NOCASE on SQLite only (see models._nocase_string)
+    return db.engine.dialect.name == 'sqlite'
+
+
+def get_login_user(username):
+    """User for a login attempt, looked up by primary key when the id is cached.
+
+    Only the id is kept in Redis; the password hash is always read from the
+    database. A cached id whose row no longer has this username is dropped.
+    Unknown usernames are not cached.
+    """
+    nocase = _usernames_nocase()
+    key = cache.login_cache_key(username, nocase)
+    cached = cache.get_bytes(key)
+    if cached is not None:
+        user = db.session.get(User, orjson.loads(cached))
+        if user is not None and (user.username.lower() == username.lower() if nocase
+                                 else user.username == username):
+            return user
+        cache.delete(key)
+
+    user = db.session.execute(select(User).where(User.username == username)).scalar_one_or_none()
+    if user is not None:
+        cache.set_json(key, user.id, ttl=LOGIN_CACHE_TTL)
+    return user
+
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     try:
@@ -34,12 +69,14 @@ def login():
             flash("Please fill in all fields", "danger")
             return render_template('login.html')
 
-        user = User.query.filter_by(username=username).first()
+        user = get_login_user(username)
 
         if user and user.check_password(password):
             login_user(user, remember=True)
             if hasattr(user, 'update_last_login'):
                 user.update_last_login()
+            # Persists last login and any password hash upgrade
+            if db.session.dirty:
                 db.session.commit()
             logger.info(f'Successful login for user {username}')
             flash(f"Welcome back, {user.username}!", "success")
@@ -82,12 +119,12 @@ def register():
             flash("Password must be at least 6 characters long", "danger")
             return render_template('register.html')
 
-        user_exists = User.query.filter(
-            or_(User.username == username, User.email == email)
-        ).first()
+        user_exists = db.session.execute(
+            select(User).where(or_(User.username == username, User.email == email)).limit(1)
+        ).scalar()
 
         if user_exists:
-            msg = 'Username already exists' if user_exists.username == username else 'Email already registered'
+            msg = 'Username already exists' if user_exists.username.lower() == username.lower() else 'Email already registered'
             flash(msg, "danger")
             return render_template('register.html')
 
@@ -95,6 +132,7 @@ def register():
         user.set_password(password)
         db.session.add(user)
         db.session.commit()
+        cache.delete(cache.login_cache_key(username, _usernames_nocase()))
 
         logger.info(f'New user registered: {username}')
         flash("Registration successful! Please log in.", "success")
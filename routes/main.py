@@ -1,10 +1,12 @@
-from flask import (Blueprint, jsonify, redirect, url_for, render_template,
+from flask import (Blueprint, Response, jsonify, redirect, url_for, render_template,
                    flash, request, current_app)
 from flask_login import login_required, current_user
 import logging
 import sys
+import time
+from functools import wraps
 from pathlib import Path
-from datetime import datetime
+from urllib.parse import urlencode
 
 # Add backend directory to system path for imports
 backend_dir = Path(__file__).parent.parent
@@ -20,13 +22,30 @@ try:
     import services
     import random
     from services.notifications import send_stress_alert_email
-    from services.fitbit_service import FitbitDataService
+    from services.fitbit_service import FITBIT_HTTP, FitbitDataService
+    from services import monitor_registry
+    from utils import now_iso
+    from models import db
     logger.info("✅ All core modules imported successfully")
 except ImportError as e:
     logger.critical(f"CRITICAL ERROR: Failed to import a core module: {e}")
     database = None
     services = None
 
+FITBIT_TOKEN_URL = 'https://api.fitbit.com/oauth2/token'
+# Static part of the OAuth authorize URL; only client_id and redirect_uri vary
+FITBIT_AUTH_BASE = ('https://www.fitbit.com/oauth2/authorize?response_type=code'
+                    '&scope=heartrate+activity+sleep&expires_in=604800')
+
+
+def with_uid(view):
+    """Pass the logged-in user's id (already a string) to the view as user_id"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, user_id=current_user.get_id(), **kwargs)
+    return wrapper
+
+
 # ---------------
 # ROUTES
 # ---------------
@@ -61,15 +80,16 @@ def index():
 
 @main_bp.route('/dashboard')
 @login_required
-def user_dashboard():
+@with_uid
+def user_dashboard(user_id):
     """Main dashboard route"""
     if not database or not services:
         flash("System service error: Cannot load monitoring modules.", "error")
         return redirect(url_for('main.index'))
 
     try:
-        user_stats = database.get_user_stats(str(current_user.id))
-        is_monitoring = str(current_user.id) in services.active_monitors
+        user_stats = database.get_user_stats(user_id)
+        is_monitoring = monitor_registry.is_active(user_id)
         return render_template('dashboard.html',
                                user_stats=user_stats,
                                is_monitoring=is_monitoring,
@@ -81,19 +101,22 @@ def user_dashboard():
 
 @main_bp.route('/start-realtime')
 @login_required
-def start_realtime():
+@with_uid
+def start_realtime(user_id):
     """Start real-time monitoring"""
     if not services:
         return jsonify({'status': 'error', 'message': 'Monitoring service not available'}), 500
 
     try:
-        user_id = str(current_user.id)
-        if user_id in services.active_monitors:
+        if monitor_registry.is_active(user_id):
             return jsonify({'status': 'already_active', 'message': 'Monitoring already active'})
 
-        monitor = services.RealTimeStressMonitor(current_user, services.ml_service, None)
-        services.active_monitors[user_id] = monitor
+        monitor = services.RealTimeStressMonitor(current_user._get_current_object(), services.ml_service, None,
+                                                 on_sample=monitor_registry.record_sample)
+        if not monitor_registry.activate(user_id, monitor):
+            return jsonify({'status': 'already_active', 'message': 'Monitoring already active'})
         monitor.start_monitoring()
+        _status_cache.pop(user_id, None)
 
         logger.info(f"Real-time monitoring started for user {current_user.username}")
         return jsonify({
@@ -107,16 +130,15 @@ def start_realtime():
 
 @main_bp.route('/stop-realtime')
 @login_required
-def stop_realtime():
+@with_uid
+def stop_realtime(user_id):
     """Stop real-time monitoring"""
     if not services:
         return jsonify({'status': 'error', 'message': 'Monitoring service not available'}), 500
 
     try:
-        user_id = str(current_user.id)
-        if user_id in services.active_monitors:
-            monitor = services.active_monitors.pop(user_id)
-            monitor.stop_monitoring()
+        if monitor_registry.deactivate(user_id):
+            _status_cache.pop(user_id, None)
             logger.info(f"Real-time monitoring stopped for user {current_user.username}")
             return jsonify({'status': 'success', 'message': 'Monitoring stopped successfully'})
         else:
@@ -125,30 +147,54 @@ def stop_realtime():
         logger.error(f"Failed to stop real-time monitoring: {exc}")
         return jsonify({'status': 'error', 'message': str(exc)}), 500
 
+# Serialized /monitoring-status bodies per user: (expires_at, bytes). Polls
+# landing within STATUS_TTL seconds of each other share one payload;
+# start/stop drop the entry so state changes show up immediately.
+STATUS_TTL = 2.0
+STATUS_CACHE_MAX = 10_000
+_status_cache = {}
+
+
 @main_bp.route('/monitoring-status')
 @login_required
-def monitoring_status():
+@with_uid
+def monitoring_status(user_id):
     """Check current monitoring status"""
     if not services:
         return jsonify({'status': 'error', 'monitoring': False, 'message': 'Monitoring service not available'}), 500
 
     try:
-        user_id = str(current_user.id)
-        if user_id in services.active_monitors:
-            monitor = services.active_monitors[user_id]
-            latest_data = monitor.get_latest_data()
-            return jsonify({
+        now = time.monotonic()
+        entry = _status_cache.get(user_id)
+        if entry is not None and entry[0] > now:
+            return Response(entry[1], mimetype='application/json')
+
+        if monitor_registry.is_active(user_id):
+            latest_data = monitor_registry.latest_sample(user_id) or {
+                'stress_level': 'baseline',
+                'confidence': 0.4,
+                'timestamp': now_iso(),
+                'status': 'No data yet'
+            }
+            payload = {
                 'status': 'active',
                 'monitoring': True,
                 'latest_data': latest_data,
                 'message': 'Monitoring is active'
-            })
+            }
         else:
-            return jsonify({
+            payload = {
                 'status': 'inactive',
                 'monitoring': False,
                 'message': 'Monitoring is not active'
-            })
+            }
+
+        # Same serializer as jsonify(), done once per TTL window
+        body = current_app.json.dumps(payload)
+        if len(_status_cache) >= STATUS_CACHE_MAX:
+            _status_cache.clear()
+        _status_cache[user_id] = (now + STATUS_TTL, body)
+        return Response(body, mimetype='application/json')
     except Exception as exc:
         logger.error(f"Status check error: {exc}")
         return jsonify({
@@ -159,31 +205,28 @@ def monitoring_status():
 
 @main_bp.route('/generate-test-data')
 @login_required
-def generate_test_data():
+@with_uid
+def generate_test_data(user_id):
     """Generate test data for demonstration"""
     if not database or not random:
         return jsonify({'status': 'error', 'message': 'Data service not available'}), 500
 
     try:
-        user_id = str(current_user.id)
-
-        for _ in range(10):
-            stress_level = random.choice(['baseline', 'stress', 'amusement'])
-            confidence = random.uniform(0.6, 0.95)
-            features = {
-                'heart_rate': random.randint(60, 100),
-                'eda': random.uniform(0.1, 1.0),
-                'temperature': random.uniform(36.0, 37.5)
+        database.store_predictions_bulk([
+            {
+                'stress_level': random.choice(['baseline', 'stress', 'amusement']),
+                'confidence': random.uniform(0.6, 0.95),
+                'features': {
+                    'heart_rate': random.randint(60, 100),
+                    'eda': random.uniform(0.1, 1.0),
+                    'temperature': random.uniform(36.0, 37.5)
+                },
+                'user_id': user_id,
+                'model_used': 'ANN',
+                'factors': []
             }
-
-            database.store_prediction(
-                stress_level,
-                confidence,
-                features,
-                user_id,
-                'ANN',
-                []
-            )
+            for _ in range(10)
+        ])
         flash("✅ Generated 10 test data points!", "success")
         return jsonify({'status': 'success', 'message': 'Test data generated'})
     except Exception as exc:
@@ -194,7 +237,6 @@ def generate_test_data():
 @login_required
 def user_profile():
     """User profile management with Fitbit integration"""
-    from models import db
 
     if request.method == 'POST':
         try:
@@ -236,13 +278,9 @@ def connect_fitbit():
             flash('⚠️ Fitbit credentials not configured.', 'error')
             return redirect(url_for('main.user_profile'))
 
-        redirect_uri = url_for('main.fitbit_callback', _external=True)
-        scope = 'heartrate activity sleep'
-
-        auth_url = (
-            f'https://www.fitbit.com/oauth2/authorize?response_type=code&client_id={client_id}'
-            f'&redirect_uri={redirect_uri}&scope={scope}&expires_in=604800'
-        )
+        # Registered callback URL from config, never derived from the request's Host
+        redirect_uri = current_app.config['FITBIT_REDIRECT_URI']
+        auth_url = f"{FITBIT_AUTH_BASE}&{urlencode({'client_id': client_id, 'redirect_uri': redirect_uri})}"
         return redirect(auth_url)
 
     except Exception as exc:
@@ -253,24 +291,17 @@ def connect_fitbit():
 @main_bp.route('/fitbit-callback')
 @login_required
 def fitbit_callback():
-    import base64
-    import requests
-    from models import db
-
     try:
         code = request.args.get('code')
         if not code:
             flash('Authorization failed or denied', 'error')
             return redirect(url_for('main.user_profile'))
 
-        token_url = "https://api.fitbit.com/oauth2/token"
         client_id = current_app.config['FITBIT_CLIENT_ID']
-        client_secret = current_app.config['FITBIT_CLIENT_SECRET']
-        redirect_uri = url_for('main.fitbit_callback', _external=True)
+        redirect_uri = current_app.config['FITBIT_REDIRECT_URI']
 
-        auth_header = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
         headers = {
-            'Authorization': f'Basic {auth_header}',
+            'Authorization': current_app.config['FITBIT_BASIC_AUTH'],
             'Content-Type': 'application/x-www-form-urlencoded'
         }
         data = {
@@ -280,7 +311,7 @@ def fitbit_callback():
             'code': code
         }
 
-        response = requests.post(token_url, headers=headers, data=data)
+        response = FITBIT_HTTP.post(FITBIT_TOKEN_URL, headers=headers, data=data, timeout=10)
         if response.status_code != 200:
             flash('Failed to obtain Fitbit tokens', 'error')
             return redirect(url_for('main.user_profile'))
@@ -301,8 +332,6 @@ def fitbit_callback():
 @main_bp.route('/disconnect-fitbit')
 @login_required
 def disconnect_fitbit():
-    from models import db
-
     try:
         current_user.fitbit_connected = False
         current_user.fitbit_access_token = None
@@ -400,7 +429,7 @@ def health_check():
             'status': 'healthy',
             'service': 'WESAD Main Routes',
             'version': '2.0',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'routes': [
                 '/dashboard',
                 '/profile',
@@ -47,9 +47,7 @@ else:
         print("   This could be a user_id mismatch issue")
 
         # Check what user IDs exist
-        import sqlite3
-
-        conn = sqlite3.connect(database.DB_PATH)
+        conn = database._connect()
         c = conn.cursor()
         c.execute("SELECT DISTINCT user_id FROM predictions LIMIT 10")
         user_ids = [row[0] for row in c.fetchall()]
@@ -0,0 +1,51 @@
+"""Convert the Keras ANN to an INT8-quantized TFLite model for CPU serving"""
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+
+def representative_dataset(X_scaled, num_samples=500):
+    """Yield scaled training samples so the converter can calibrate activation ranges"""
+    rng = np.random.default_rng(42)
+    indices = rng.choice(len(X_scaled), size=min(num_samples, len(X_scaled)), replace=False)
+
+    def generator():
+        for i in indices:
+            yield [X_scaled[i:i + 1].astype(np.float32)]
+
+    return generator
+
+
+def convert_ann_to_int8(model_path='models/emotion_ann_model.h5',
+                        scaler_path='models/scaler.save',
+                        data_path='wesad_features.csv',
+                        output_path='models/emotion_ann_int8.tflite'):
+    """Post-training INT8 quantization of the ANN (weights + activations)"""
+    model = tf.keras.models.load_model(model_path)
+    scaler = joblib.load(scaler_path)
+
+    data = pd.read_csv(data_path)
+    X = data.drop('label', axis=1).values
+    X_scaled = scaler.transform(X)
+    print(f"✅ Loaded {X_scaled.shape[0]} calibration samples with {X_scaled.shape[1]} features")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset(X_scaled)
+
+    tflite_model = converter.convert()
+    Path(output_path).write_bytes(tflite_model)
+
+    original_kb = Path(model_path).stat().st_size / 1024
+    quantized_kb = len(tflite_model) / 1024
+    print(f"✅ Saved {output_path} ({quantized_kb:.1f} KB, was {original_kb:.1f} KB)")
+    return output_path
+
+
+if __name__ == '__main__':
+    data_path = sys.argv[1] if len(sys.argv) > 1 else 'wesad_features.csv'
+    convert_ann_to_int8(data_path=data_path)
@@ -10,7 +10,7 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from models.hybrid_model import CNNLSTMModel, create_windowed_dataset
+from models.hybrid_model import CNNLSTMModel, configure_mixed_precision, create_windowed_dataset
 
 
 def load_wesad_data(filepath='data/processed_wesad.csv'):
@@ -30,6 +30,9 @@ def load_wesad_data(filepath='data/processed_wesad.csv'):
 def main():
     print("🚀 Training CNN-LSTM Hybrid Model for WESAD Stress Detection")
 
+    # Half-precision activations leave room for twice the batch size
+    batch_size = 64 if configure_mixed_precision() else 32
+
     # Load data
     X, y = load_wesad_data()
     print(f"✅ Loaded data: {X.shape[0]} samples, {X.shape[1]} features")
@@ -64,7 +67,7 @@ def main():
     model.model.summary()
 
     print("\n🎯 Training model...")
-    history = model.train(X_train, y_train, X_val, y_val, epochs=50, batch_size=32)
+    history = model.train(X_train, y_train, X_val, y_val, epochs=50, batch_size=batch_size)
 
     # Evaluate
     print("\n📊 Evaluating on test set...")
@@ -83,7 +86,7 @@ def main():
     attention_model.build_attention_model()
 
     print("\n🎯 Training attention model...")
-    history_attention = attention_model.train(X_train, y_train, X_val, y_val, epochs=50, batch_size=32)
+    history_attention = attention_model.train(X_train, y_train, X_val, y_val, epochs=50, batch_size=batch_size)
 
     metrics_attention = attention_model.evaluate(X_test, y_test)
     print(f"\nAttention Model - Test Accuracy: {metrics_attention['accuracy']:.4f}")
@@ -65,10 +65,15 @@ class MLService:
 class RealTimeStressMonitor:
     """Real-time stress monitoring for users"""
 
-    def __init__(self, user, ml_service_instance, socketio_instance):
+    def __init__(self, user, ml_service_instance, socketio_instance, on_sample=None):
         self.user = user
+        # Plain copies: the monitoring thread runs outside any request or DB session
+        self.user_id = str(user.id)
+        self.username = user.username
         self.ml_service = ml_service_instance
         self.socketio = socketio_instance
+        # Called with (user_id, sample) after each prediction; returning False stops the loop
+        self.on_sample = on_sample
         self.active = False
         self.monitoring_thread = None
         self.latest_sensor_data = {}
@@ -92,12 +97,12 @@ class RealTimeStressMonitor:
                 daemon=True
             )
             self.monitoring_thread.start()
-            logger.info(f"✅ Monitoring started for user {self.user.username}")
+            logger.info(f"✅ Monitoring started for user {self.username}")
 
     def stop_monitoring(self):
         """Stop the monitoring thread"""
         self.active = False
-        logger.info(f"⏹️ Monitoring stopped for user {self.user.username}")
+        logger.info(f"⏹️ Monitoring stopped for user {self.username}")
 
     def _monitoring_loop(self):
         """Main monitoring loop"""
@@ -114,13 +119,25 @@ class RealTimeStressMonitor:
                             stress_level=prediction['stress_level'],
                             confidence=prediction['confidence'],
                             features=sensor_data,
-                            user_id=str(self.user.id),
+                            user_id=self.user_id,
                             model_used=prediction['model_used'],
                             factors=prediction.get('factors', [])
                         )
                     except Exception as e:
                         logger.debug(f"Could not store prediction: {e}")
 
+                    if self.on_sample is not None:
+                        sample = {
+                            'stress_level': prediction['stress_level'],
+                            'confidence': prediction['confidence'],
+                            'timestamp': sensor_data['timestamp'],
+                            'status': 'Active',
+                            'source': sensor_data.get('source', 'simulated')
+                        }
+                        if not self.on_sample(self.user_id, sample):
+                            self.stop_monitoring()
+                            break
+
                     if self.socketio:
                         try:
                             self.socketio.emit('real_time_update', {
@@ -129,7 +146,7 @@ class RealTimeStressMonitor:
                                 'timestamp': datetime.now(timezone.utc).isoformat(),
                                 'sensor_data': sensor_data,
                                 'factors': prediction.get('factors', [])
-                            }, room=f'user_{self.user.id}')
+                            }, room=f'user_{self.user_id}')
                         except Exception as e:
                             logger.debug(f"SocketIO emit failed: {e}")
 
@@ -0,0 +1,147 @@
+"""Optional Redis cache for hot, per-user API responses
+
+Set REDIS_URL to enable it. Without it (or without the redis package, or
+while Redis is unreachable) every lookup is a miss and callers simply
+compute the response as before.
+"""
+import logging
+
+import orjson
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_disabled = False
+
+
+def get_redis():
+    """Shared Redis client backed by redis-py's connection pool, or None"""
+    global _client, _disabled
+    if _client is None and not _disabled:
+        if not Config.REDIS_URL:
+            _disabled = True
+            return None
+        try:
+            import redis
+        except ImportError:
+            logger.warning("REDIS_URL is set but the 'redis' package is not installed; caching disabled")
+            _disabled = True
+            return None
+        _client = redis.Redis.from_url(Config.REDIS_URL, socket_timeout=0.5)
+        logger.info("✅ Redis response cache enabled")
+    return _client
+
+
+def get_bytes(key):
+    """Cached value for key, or None on a miss or when Redis is unavailable"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return client.get(key)
+    except Exception as e:
+        logger.debug(f"Cache get failed for {key}: {e}")
+        return None
+
+
+def set_json(key, value, ttl=None):
+    """Serialize value with orjson, store it for ttl seconds and return the bytes.
+
+    numpy arrays and scalars are serialized natively, without ``tolist()``.
+    """
+    payload = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(key, payload, ex=ttl or Config.API_CACHE_TTL)
+        except Exception as e:
+            logger.debug(f"Cache set failed for {key}: {e}")
+    return payload
+
+
+def login_cache_key(username, nocase=False):
+    """Key of the user id cached for a login username.
+
+    Pass ``nocase`` where usernames compare case-insensitively (NOCASE on
+    SQLite); elsewhere "Alice" and "alice" are different users.
+    """
+    return f'user:uname:{username.lower() if nocase else username}'
+
+
+def delete(*keys):
+    """Drop keys so the next lookup recomputes them"""
+    client = get_redis()
+    if client is None or not keys:
+        return
+    try:
+        client.delete(*keys)
+    except Exception as e:
+        logger.debug(f"Cache delete failed for {keys}: {e}")
+
+# Rolling window of each user's latest readings, kept newest-first in two
+# aligned lists: emotion codes under sl:{uid} and heart rates under hr:{uid}
+RECENT_WINDOW = 50
+RECENT_TTL = 3600
+
+# Dense integer codes for emotion labels; anything unrecognised counts as baseline
+EMOTION_CODES = {'baseline': 0, 'stress': 1, 'amusement': 2}
+
+
+def _recent_keys(user_id):
+    return f'sl:{user_id}', f'hr:{user_id}'
+
+
+def get_recent_readings(user_id):
+    """(emotion codes, heart rates) of the user's cached window, or None on a miss"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        pipe = client.pipeline()
+        for key in _recent_keys(user_id):
+            pipe.lrange(key, 0, RECENT_WINDOW - 1)
+        codes, heart_rates = pipe.execute()
+    except Exception as e:
+        logger.debug(f"Recent readings get failed for {user_id}: {e}")
+        return None
+    if not codes or len(codes) != len(heart_rates):
+        return None
+    return [int(c) for c in codes], [float(hr) for hr in heart_rates]
+
+
+def seed_recent_readings(user_id, codes, heart_rates):
+    """Replace the user's window with readings loaded from the database (newest first)"""
+    client = get_redis()
+    if client is None or not codes:
+        return
+    try:
+        pipe = client.pipeline()
+        for key, values in zip(_recent_keys(user_id), (codes, heart_rates)):
+            pipe.delete(key)
+            pipe.rpush(key, *values[:RECENT_WINDOW])
+            pipe.expire(key, RECENT_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Recent readings seed failed for {user_id}: {e}")
+
+
+def push_recent_reading(user_id, code, heart_rate):
+    """Slide a new reading into the user's window.
+
+    LPUSHX only extends a window that is already seeded, so a partial window
+    is never mistaken for the full history; the next read seeds it instead.
+    """
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline()
+        for key, value in zip(_recent_keys(user_id), (code, heart_rate)):
+            pipe.lpushx(key, value)
+            pipe.ltrim(key, 0, RECENT_WINDOW - 1)
+            pipe.expire(key, RECENT_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Recent readings push failed for {user_id}: {e}")
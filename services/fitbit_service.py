@@ -1,12 +1,31 @@
 """Enhanced Fitbit Real-time Data Service with Eventlet-Compatible Background Sync"""
 import logging
-import eventlet
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import random
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import now_iso
+
 logger = logging.getLogger(__name__)
 
+# Shared pool for overlapping independent Fitbit API calls (blocking HTTP),
+# so a request waits for the slowest call rather than the sum of all of them
+_fitbit_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fitbit')
+
+# One keep-alive connection pool to api.fitbit.com for the whole process:
+# mounted on every Fitbit client's session and used directly for the OAuth
+# token exchange, so calls reuse warm TLS connections instead of reconnecting
+FITBIT_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=20,
+                             max_retries=Retry(total=2, backoff_factor=0.1))
+FITBIT_HTTP = requests.Session()
+FITBIT_HTTP.mount('https://', FITBIT_ADAPTER)
+
 class FitbitDataService:
     """Service for fetching real-time data from Fitbit API with caching"""
 
@@ -15,6 +34,10 @@ class FitbitDataService:
         self.client = None
         self.cache = {}
         self.cache_timeout = 60  # Cache timeout in seconds
+        # Token refreshes seen on pool threads are persisted from this thread
+        self._owner_thread = threading.get_ident()
+        self._tokens_refreshed = False
+        self._refresh_lock = threading.Lock()
         self._initialize_client()
 
     def _initialize_client(self):
@@ -39,6 +62,9 @@ class FitbitDataService:
                 refresh_token=self.user.fitbit_refresh_token,
                 refresh_cb=self._token_refresh_callback
             )
+            # fitbit.Fitbit wraps a requests_oauthlib OAuth2Session
+            self.client.client.session.mount('https://', FITBIT_ADAPTER)
+            self._serialize_token_refresh(self.client.client)
             logger.info(f"✅ Fitbit client initialized for {self.user.username}")
             return True
 
@@ -46,17 +72,53 @@ class FitbitDataService:
             logger.error(f"❌ Fitbit client initialization failed: {e}")
             return False
 
+    def _serialize_token_refresh(self, oauth_client):
+        """Let only one of the parallel calls that hit an expired token refresh it.
+
+        Fitbit refresh tokens are single-use, so when _fetch_parallel() calls
+        all see the expired token, a second refresh with the same refresh
+        token would fail. Calls that waited on the lock reuse the token the
+        first one obtained.
+        """
+        refresh = oauth_client.refresh_token
+
+        def refresh_once():
+            stale = oauth_client.session.token.get('access_token')
+            with self._refresh_lock:
+                if oauth_client.session.token.get('access_token') != stale:
+                    return oauth_client.session.token
+                return refresh()
+
+        oauth_client.refresh_token = refresh_once
+
     def _token_refresh_callback(self, token):
         """Callback to update tokens when refreshed"""
+        self.user.fitbit_access_token = token['access_token']
+        self.user.fitbit_refresh_token = token['refresh_token']
+        self._tokens_refreshed = True
+        # A refresh during a parallel fetch runs on a pool thread, outside the
+        # app context; _fetch_parallel() saves it once the calls complete
+        if threading.get_ident() == self._owner_thread:
+            self._save_tokens()
+
+    def _save_tokens(self):
+        """Commit refreshed tokens on the user's session"""
         try:
             from models import db
-            self.user.fitbit_access_token = token['access_token']
-            self.user.fitbit_refresh_token = token['refresh_token']
             db.session.commit()
+            self._tokens_refreshed = False
             logger.info("✅ Fitbit tokens refreshed and saved")
         except Exception as e:
             logger.error(f"❌ Token refresh callback failed: {e}")
 
+    def _fetch_parallel(self, *fetchers):
+        """Run independent fetch methods concurrently, returning their results in order"""
+        futures = [_fitbit_pool.submit(fetch) for fetch in fetchers]
+        results = [future.result() for future in futures]
+        if self._tokens_refreshed:
+            self._save_tokens()
+        return results
+
     def _get_cached_or_fetch(self, cache_key, fetch_function):
         """Get data from cache or fetch new data"""
         current_time = time.time()
@@ -112,14 +174,19 @@ class FitbitDataService:
             if date is None:
                 date = datetime.now().strftime('%Y-%m-%d')
 
-            data = self.client.get_hrv(date=date)
-            if data.get('hrv'):
-                hrv_data = data['hrv'][0]
-                return {
-                    'daily_rmssd': hrv_data.get('value', {}).get('dailyRmssd', 0),
-                    'deep_rmssd': hrv_data.get('value', {}).get('deepRmssd', 0)
-                }
-            return None
+            def fetch():
+                data = self.client.get_hrv(date=date)
+                if data.get('hrv'):
+                    hrv_data = data['hrv'][0]
+                    return {
+                        'daily_rmssd': hrv_data.get('value', {}).get('dailyRmssd', 0),
+                        'deep_rmssd': hrv_data.get('value', {}).get('deepRmssd', 0)
+                    }
+                return None
+
+            # Cached like the other endpoints, so the HRV stress score and the
+            # raw HRV lookup in one request share a single API call
+            return self._get_cached_or_fetch(f'hrv_{date}', fetch)
 
         except Exception as e:
             logger.error(f"❌ HRV fetch failed: {e}")
@@ -200,9 +267,11 @@ class FitbitDataService:
                 logger.warning("Fitbit client not initialized - returning simulated data")
                 return self._get_simulated_data()
 
-            hr_data = self.get_heart_rate_intraday()
-            activity = self.get_activity_summary()
-            hrv = self.get_heart_rate_variability()
+            hr_data, activity, hrv = self._fetch_parallel(
+                self.get_heart_rate_intraday,
+                self.get_activity_summary,
+                self.get_heart_rate_variability
+            )
 
             latest_hr = hr_data[-1]['value'] if hr_data else 70
 
@@ -216,7 +285,7 @@ class FitbitDataService:
                 'sedentary_minutes': activity.get('sedentary_minutes', 0) if activity else 0,
                 'resting_heart_rate': activity.get('resting_heart_rate', 0) if activity else 0,
                 'floors': activity.get('floors', 0) if activity else 0,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'source': 'fitbit',
                 'user_id': self.user.id
             }
@@ -240,7 +309,7 @@ class FitbitDataService:
             'sedentary_minutes': random.randint(300, 600),
             'resting_heart_rate': random.randint(55, 75),
             'floors': random.randint(0, 10),
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'source': 'simulated',
             'user_id': self.user.id,
             'error': error
@@ -276,12 +345,13 @@ class FitbitDataService:
 
 
 class FitbitBackgroundSync:
-    """Background service for continuous Fitbit data sync with eventlet"""
+    """Background service for continuous Fitbit data sync in a daemon thread"""
 
     def __init__(self, app):
         self.app = app
         self.running = False
-        self.greenthread = None
+        self.thread = None
+        self.stop_event = threading.Event()
         self.sync_interval = 60
 
     def start_sync(self, user):
@@ -289,13 +359,16 @@ class FitbitBackgroundSync:
             logger.warning("Sync already running")
             return
         self.running = True
-        self.greenthread = eventlet.spawn(self._sync_loop, user)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._sync_loop, args=(user,), daemon=True)
+        self.thread.start()
         logger.info(f"✅ Started Fitbit background sync for user {user.username}")
 
     def stop_sync(self):
         self.running = False
-        if self.greenthread:
-            self.greenthread.kill()
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
         logger.info("⏹️ Stopped Fitbit background sync")
 
     def _sync_loop(self, user):
@@ -326,11 +399,11 @@ class FitbitBackgroundSync:
                         )
                         logger.info(f"📊 Synced: HR={phys_data['heart_rate']}, Stress={stress_score:.2f}")
 
-                eventlet.sleep(self.sync_interval)
+                self.stop_event.wait(self.sync_interval)
 
             except Exception as e:
                 logger.error(f"❌ Sync error: {e}")
-                eventlet.sleep(self.sync_interval)
+                self.stop_event.wait(self.sync_interval)
 
 
 # Global sync service instance
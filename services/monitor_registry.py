@@ -0,0 +1,142 @@
+"""Registry of users with real-time monitoring running, shared across workers
+
+With Redis (REDIS_URL) each monitored user has a lease key ``mon:{uid}:active``
+naming the monitor that owns it, and the latest samples live in
+``mon:{uid}:samples``, so every gunicorn worker answers dashboard and status
+checks the same way. Every sample renews the lease; a monitor lost in a crash
+or redeploy simply lets it expire. Monitor objects themselves stay in the
+worker that started them. Without Redis the registry is this process's dict,
+as before.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+
+import orjson
+
+from services import cache
+
+logger = logging.getLogger(__name__)
+
+# Monitors sample every 3-5 seconds, so a lease outlives a few slow iterations
+MONITOR_TTL = 30
+SAMPLES_KEEP = 10
+
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+# Monitors started by this worker, by user id: (monitor, lease token)
+_local = {}
+_lock = threading.Lock()
+
+
+def _active_key(user_id):
+    return f'mon:{user_id}:active'
+
+
+def _samples_key(user_id):
+    return f'mon:{user_id}:samples'
+
+
+def is_active(user_id):
+    """Whether any worker is monitoring the user"""
+    client = cache.get_redis()
+    if client is not None:
+        try:
+            return bool(client.exists(_active_key(user_id)))
+        except Exception as e:
+            logger.debug(f"Monitor registry lookup failed for {user_id}: {e}")
+    return user_id in _local
+
+
+def activate(user_id, monitor):
+    """Register monitor as the user's, owned by this worker.
+
+    Returns False without registering when the user is already monitored.
+    """
+    token = f'{WORKER_ID}:{uuid.uuid4().hex}'
+    client = cache.get_redis()
+    if client is not None:
+        try:
+            if not client.set(_active_key(user_id), token, nx=True, ex=MONITOR_TTL):
+                return False
+        except Exception as e:
+            logger.debug(f"Monitor registry activate failed for {user_id}: {e}")
+    with _lock:
+        previous = _local.get(user_id)
+        if client is None and previous is not None:
+            return False
+        _local[user_id] = (monitor, token)
+    if previous is not None:
+        # Lease expired or was released elsewhere while this worker's monitor ran on
+        previous[0].stop_monitoring()
+    return True
+
+
+def deactivate(user_id):
+    """Release the user's lease and stop the monitor if this worker owns it.
+
+    A monitor owned by another worker stops itself on its next sample, when
+    record_sample() finds the lease gone. Returns False if the user was not
+    being monitored.
+    """
+    client = cache.get_redis()
+    was_active = False
+    if client is not None:
+        try:
+            pipe = client.pipeline()
+            pipe.delete(_active_key(user_id))
+            pipe.delete(_samples_key(user_id))
+            was_active = bool(pipe.execute()[0])
+        except Exception as e:
+            logger.debug(f"Monitor registry deactivate failed for {user_id}: {e}")
+    with _lock:
+        entry = _local.pop(user_id, None)
+    if entry is not None:
+        entry[0].stop_monitoring()
+    return was_active or entry is not None
+
+
+def record_sample(user_id, sample):
+    """Publish the monitor's latest sample and renew its lease.
+
+    Returns False once the lease is gone or belongs to another monitor, which
+    tells the calling monitor to stop.
+    """
+    entry = _local.get(user_id)
+    if entry is None:
+        return False
+    client = cache.get_redis()
+    if client is None:
+        return True
+    active_key, samples_key = _active_key(user_id), _samples_key(user_id)
+    try:
+        owner = client.get(active_key)
+        if owner is None or owner.decode() != entry[1]:
+            with _lock:
+                if _local.get(user_id) is entry:
+                    del _local[user_id]
+            return False
+        pipe = client.pipeline()
+        pipe.expire(active_key, MONITOR_TTL)
+        pipe.lpush(samples_key, orjson.dumps(sample, option=orjson.OPT_SERIALIZE_NUMPY))
+        pipe.ltrim(samples_key, 0, SAMPLES_KEEP - 1)
+        pipe.expire(samples_key, MONITOR_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Monitor sample publish failed for {user_id}: {e}")
+    return True
+
+
+def latest_sample(user_id):
+    """Most recent sample published for the user, or None if there is none yet"""
+    client = cache.get_redis()
+    if client is not None:
+        try:
+            raw = client.lindex(_samples_key(user_id), 0)
+            return orjson.loads(raw) if raw is not None else None
+        except Exception as e:
+            logger.debug(f"Monitor sample lookup failed for {user_id}: {e}")
+    entry = _local.get(user_id)
+    return entry[0].get_latest_data() if entry is not None else None
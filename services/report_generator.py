@@ -232,9 +232,9 @@ def generate_user_report(user_id):
     """Generate report for a specific user"""
     try:
         import database
-        from models import User
+        from models import User, db
 
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if not user:
             return None
 
@@ -9,8 +9,6 @@ sys.path.append(str(Path(__file__).parent))
 
 import database
 import random
-import json
-import sqlite3
 
 print("\n" + "=" * 60)
 print("🔧 WESAD Timeline Fix Tool")
@@ -45,7 +43,7 @@ with app.app_context():
 
         emotions = ['baseline', 'stress', 'amusement']
         emotion_weights = [0.6, 0.3, 0.1]
-        total_generated = 0
+        predictions = []
 
         for day in range(7):
             date = datetime.now(timezone.utc) - timedelta(days=6 - day)
@@ -66,30 +64,19 @@ with app.app_context():
                     'temperature': round(random.uniform(36.0, 37.5), 2)
                 }
 
-                conn = sqlite3.connect(database.DB_PATH)
-                c = conn.cursor()
-
-                c.execute('''
-                    INSERT INTO predictions 
-                    (timestamp, prediction, probability, user_id, features, model_used, 
-                     explanation_factors, heart_rate, stress_score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    timestamp.isoformat(),
-                    emotion,
-                    confidence,
-                    user_id,  # Correct user ID!
-                    json.dumps(features),
-                    'ANN',
-                    '[]',
-                    heart_rate,
-                    confidence if emotion == 'stress' else (1 - confidence)
-                ))
-
-                conn.commit()
-                conn.close()
-                total_generated += 1
-
+                predictions.append({
+                    'timestamp': timestamp.isoformat(),
+                    'stress_level': emotion,
+                    'confidence': confidence,
+                    'features': features,
+                    'user_id': user_id,  # Correct user ID!
+                    'model_used': 'ANN',
+                    'factors': []
+                })
+
+        # One transaction; database's own hook also slides each row into the
+        # Redis recent-readings window
+        total_generated = database.store_predictions_bulk(predictions)
         print(f"✅ Generated {total_generated} records for user {user_id}")
     else:
         print(f"✅ Data already exists - should work now!")
@@ -1,10 +1,30 @@
 """Utility functions for WESAD application"""
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# (monotonic time, ISO string) of the last formatted timestamp
+_now_iso_cache = (float('-inf'), '')
+
+
+def now_iso(max_age=0.1):
+    """Current UTC time as ISO 8601, reused for up to max_age seconds.
+
+    Bursts of requests share one formatted string instead of each doing a
+    clock read and format. The cache is swapped as a single tuple, so
+    concurrent callers always see a consistent, recent value.
+    """
+    global _now_iso_cache
+    t = time.monotonic()
+    cached_at, value = _now_iso_cache
+    if t - cached_at > max_age:
+        value = datetime.now(timezone.utc).isoformat()
+        _now_iso_cache = (t, value)
+    return value
+
 
 def generate_personalized_recommendations(user_id):
     """Generate AI-powered personalized recommendations"""